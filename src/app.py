@@ -4,23 +4,94 @@
 import sys
 import os
 
+# Stop every OpenMP library (Tesseract, OpenCV, MKL) from grabbing all cores
+# per worker - with N workers that means N x cores threads fighting each other.
+# Must happen before those libraries are imported.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('MKL_NUM_THREADS', '1')
+
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, render_template, request, jsonify, send_file, session
+from flask import Flask, Request, Response, render_template, request, jsonify, send_from_directory, session
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
 import uuid
+import tempfile
 from datetime import datetime
 import json
 from pathlib import Path
 import threading
 import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from collections import deque
+from cachetools import TTLCache
+
+# orjson serializes in C, several times faster than the json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import our processing system
 from core.integrated_ticket_processor import IntegratedTicketFiller
 
+class UploadRequest(Request):
+    """
+    Request that spools uploaded files straight into the upload folder
+    Werkzeug normally buffers each file in a temp file (or RAM) and then
+    copies it again on save() - this way saving is just a rename
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type,
+                         filename=None, content_length=None):
+        spooled = tempfile.NamedTemporaryFile(
+            dir=app.config['UPLOAD_FOLDER'], suffix='.part', delete=False
+        )
+        self.__dict__.setdefault('_spooled_paths', []).append(spooled.name)
+        return spooled
+    
+    def close(self):
+        super().close()
+        # Remove parts that were never moved into place (e.g. rejected uploads)
+        for path in self.__dict__.get('_spooled_paths', []):
+            if os.path.exists(path):
+                os.remove(path)
+
+def save_upload(file_storage, path):
+    """Move a spooled upload into place, falling back to a normal save"""
+    stream = file_storage.stream
+    spooled_path = getattr(stream, 'name', None)
+    
+    if isinstance(spooled_path, str) and spooled_path.endswith('.part'):
+        stream.close()
+        os.replace(spooled_path, path)
+    else:
+        file_storage.save(path)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider for jsonify() that uses orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(
+            obj,
+            default=self.default,  # Flask's fallback for anything orjson can't handle
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 app.secret_key = 'your-secret-key-here'  # Change this!
 CORS(app)
 
@@ -28,74 +99,188 @@ CORS(app)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max
+# Outputs never change once written, so browsers may cache them for a day
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 24 * 60 * 60
+# Tickets processed in parallel - each worker holds its own Whisper model
+app.config['MAX_WORKERS'] = min(os.cpu_count() or 1, int(os.environ.get('QUICKCITE_WORKERS', 2)))
+# With a broker configured, Celery workers own the models (see tasks.py)
+app.config['USE_CELERY'] = bool(os.environ.get('CELERY_BROKER_URL'))
+
+if app.config['USE_CELERY']:
+    from tasks import celery, process_ticket_task
 
 # Allowed extensions
 ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
 ALLOWED_AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.mp4'}
 
-# Create folders
-for folder in ['uploads', 'outputs', 'static/previews']:
-    os.makedirs(folder, exist_ok=True)
+# Folders are created on the first upload, not at import (cheaper worker startup)
+_dirs_ready = False
+_dirs_lock = threading.Lock()
+
+def ensure_dirs():
+    """Create the working folders once per process"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    with _dirs_lock:
+        if _dirs_ready:
+            return
+        for folder in [app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER'], 'static/previews']:
+            os.makedirs(folder, exist_ok=True)
+        _dirs_ready = True
+
+# Job statuses expire after an hour so the dict can't grow forever
+processing_status = TTLCache(maxsize=10000, ttl=3600)
+# Last 10 completed jobs as (timestamp, job_id, output_file), newest first
+completed_jobs = deque(maxlen=10)
+# Worker threads and Flask request threads both touch the above
+status_lock = threading.Lock()
+# One condition per unfinished job, notified whenever its status changes
+job_conditions = {}
+
+FINISHED_STATES = ('completed', 'error')
+# How often /events asks the Celery result backend for news
+CELERY_POLL_INTERVAL = 1.0
+# Idle SSE connections get a comment this often so proxies don't drop them
+KEEP_ALIVE_INTERVAL = 30
 
-# Processing queue for async operations
-processing_queue = queue.Queue()
-processing_status = {}
+def set_status(job_id, status):
+    """Store a job's status, recording it in the history once completed"""
+    with status_lock:
+        previous = processing_status.get(job_id)
+        processing_status[job_id] = status
+        # Celery jobs get recorded on every poll that sees them finish - list them once
+        if status['status'] == 'completed' and (previous is None or previous['status'] != 'completed'):
+            completed_jobs.appendleft((status['timestamp'], job_id, status['output_file']))
+        
+        # Wake up any /events streams watching this job
+        # (Celery streams poll instead, so they never get a condition)
+        condition = job_conditions.get(job_id)
+        if (condition is None and status['status'] not in FINISHED_STATES
+                and not app.config['USE_CELERY']):
+            condition = job_conditions[job_id] = threading.Condition(status_lock)
+        if condition is not None:
+            condition.notify_all()
+            if status['status'] in FINISHED_STATES:
+                del job_conditions[job_id]
 
-class ProcessingThread(threading.Thread):
-    """Background thread for processing tickets"""
+class ProcessorPool:
+    """
+    Fixed set of preloaded processors shared by the worker threads
+    Each one holds a Whisper model, so we load them once and lend them out
+    """
     
-    def __init__(self):
-        super().__init__()
-        self.daemon = True
-        self.processor = IntegratedTicketFiller(whisper_model="tiny")
+    def __init__(self, size, whisper_model="tiny"):
+        self.size = size
+        # Split the cores between workers: size x threads per worker ~= cores
+        whisper_threads = max(1, (os.cpu_count() or 1) // size)
         
-    def run(self):
-        """Process tickets from the queue"""
-        while True:
-            try:
-                # Get job from queue
-                job = processing_queue.get()
-                job_id = job['id']
-                
-                # Update status
-                processing_status[job_id] = {
-                    'status': 'processing',
-                    'progress': 10,
-                    'message': 'Starting processing...'
-                }
-                
-                # Process the ticket
-                try:
-                    result = self.processor.process_complete_ticket(
-                        job['image_path'],
-                        job['audio_path'],
-                        job['output_path']
-                    )
-                    
-                    # Update success status
-                    processing_status[job_id] = {
-                        'status': 'completed',
-                        'progress': 100,
-                        'message': 'Processing complete!',
-                        'output_file': job['output_filename'],
-                        'field_mappings': result.get('field_mappings', []),
-                        'audio_data': result.get('audio_data', {})
-                    }
-                    
-                except Exception as e:
-                    # Update error status
-                    processing_status[job_id] = {
-                        'status': 'error',
-                        'progress': 0,
-                        'message': f'Error: {str(e)}'
-                    }
-                
-            except Exception as e:
-                print(f"Processing thread error: {e}")
-
-# Start processing thread
-processing_thread = ProcessingThread()
-processing_thread.start()
+        self._processors = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._processors.put(IntegratedTicketFiller(
+                whisper_model=whisper_model,
+                whisper_threads=whisper_threads
+            ))
+    
+    @contextmanager
+    def borrow(self):
+        """Lend out a processor, waiting if they are all busy"""
+        processor = self._processors.get()
+        try:
+            yield processor
+        finally:
+            self._processors.put(processor)
+
+if not app.config['USE_CELERY']:
+    # Memory stays at MAX_WORKERS models no matter how many jobs are queued
+    processor_pool = ProcessorPool(app.config['MAX_WORKERS'])
+    
+    # Whisper and OpenCV release the GIL, so worker threads scale across cores
+    executor = ThreadPoolExecutor(max_workers=app.config['MAX_WORKERS'])
+
+def process_job(job):
+    """Process one ticket on a worker thread"""
+    job_id = job['id']
+    
+    # Update status
+    set_status(job_id, {
+        'status': 'processing',
+        'progress': 10,
+        'message': 'Starting processing...'
+    })
+    
+    try:
+        # Process the ticket
+        with processor_pool.borrow() as processor:
+            result = processor.process_complete_ticket(
+                job['image_path'],
+                job['audio_path'],
+                job['output_path']
+            )
+        
+        # Update success status
+        set_status(job_id, {
+            'status': 'completed',
+            'progress': 100,
+            'message': 'Processing complete!',
+            'timestamp': datetime.now().isoformat(),
+            'output_file': job['output_filename'],
+            'field_mappings': result.get('field_mappings', []),
+            'audio_data': result.get('audio_data', {})
+        })
+        
+    except Exception as e:
+        # Update error status
+        set_status(job_id, {
+            'status': 'error',
+            'progress': 0,
+            'message': f'Error: {str(e)}'
+        })
+
+def current_status(job_id):
+    """A job's latest status, or None for ids we never queued (or that expired)"""
+    with status_lock:
+        status = processing_status.get(job_id)
+    
+    # Unfinished Celery jobs only have their upload status here - ask Celery
+    if status is not None and app.config['USE_CELERY'] and status['status'] not in FINISHED_STATES:
+        status = get_celery_status(job_id)
+    return status
+
+def get_celery_status(job_id):
+    """Translate a Celery task state into our status format"""
+    result = celery.AsyncResult(job_id)
+    
+    if result.state == 'SUCCESS':
+        status = {
+            'status': 'completed',
+            'progress': 100,
+            'message': 'Processing complete!',
+            'timestamp': (result.date_done or datetime.now()).isoformat(),
+            **result.result
+        }
+        # Keep it like a local job, so /history lists it and later polls skip the backend
+        set_status(job_id, status)
+        return status
+    elif result.state == 'FAILURE':
+        return {
+            'status': 'error',
+            'progress': 0,
+            'message': f'Error: {str(result.result)}'
+        }
+    elif result.state == 'STARTED':
+        return {
+            'status': 'processing',
+            'progress': 10,
+            'message': 'Starting processing...'
+        }
+    
+    # Celery reports unknown task ids as PENDING too - current_status only asks about ours
+    return {
+        'status': 'queued',
+        'progress': 0,
+        'message': 'Waiting in queue...'
+    }
 
 @app.route('/')
 def index():
@@ -105,6 +290,9 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_files():
     """Handle file uploads and start processing"""
+    # Before touching request.files - uploads are spooled into UPLOAD_FOLDER
+    ensure_dirs()
+    
     try:
         # Check if files are present
         if 'ticket_image' not in request.files or 'audio_file' not in request.files:
@@ -141,10 +329,10 @@ def upload_files():
         output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
         
         # Save uploaded files
-        ticket_image.save(image_path)
-        audio_file.save(audio_path)
+        save_upload(ticket_image, image_path)
+        save_upload(audio_file, audio_path)
         
-        # Add to processing queue
+        # Hand the job to the worker pool
         job = {
             'id': job_id,
             'image_path': image_path,
@@ -154,14 +342,22 @@ def upload_files():
             'timestamp': datetime.now().isoformat()
         }
         
-        processing_queue.put(job)
-        
-        # Initialize status
-        processing_status[job_id] = {
+        # Initialize status - with Celery this also marks the id as ours, since
+        # Celery reports ids it has never seen as PENDING
+        set_status(job_id, {
             'status': 'queued',
             'progress': 0,
             'message': 'Waiting in queue...'
-        }
+        })
+        
+        if app.config['USE_CELERY']:
+            # Celery tracks the status from here on, keyed by our job id
+            process_ticket_task.apply_async(
+                args=(image_path, audio_path, output_path, output_filename),
+                task_id=job_id
+            )
+        else:
+            executor.submit(process_job, job)
         
         return jsonify({
             'success': True,
@@ -175,46 +371,117 @@ def upload_files():
 @app.route('/status/<job_id>')
 def get_status(job_id):
     """Get processing status"""
-    if job_id in processing_status:
-        return jsonify(processing_status[job_id])
+    status = current_status(job_id)
+    
+    if status is not None:
+        return jsonify(status)
     else:
         return jsonify({'error': 'Job not found'}), 404
 
+@app.route('/events/<job_id>')
+def stream_status(job_id):
+    """
+    Push status updates as Server-Sent Events
+    Teaching: Instead of the browser asking "done yet?" every second,
+    we send a message only when something actually changes
+    """
+    if app.config['USE_CELERY']:
+        return Response(celery_events(job_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache'})
+    
+    def events():
+        last_status = None
+        while True:
+            with status_lock:
+                status = processing_status.get(job_id)
+                condition = job_conditions.get(job_id)
+                if status is last_status and condition is not None:
+                    condition.wait(timeout=KEEP_ALIVE_INTERVAL)
+                    status = processing_status.get(job_id)
+            
+            if status is None:
+                yield f"data: {app.json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            
+            if status is last_status:
+                yield ": keep-alive\n\n"  # Nothing new, keep the connection open
+                continue
+            
+            yield f"data: {app.json.dumps(status)}\n\n"
+            last_status = status
+            
+            if status['status'] in FINISHED_STATES:
+                return
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+def celery_events(job_id):
+    """
+    Server-Sent Events for a Celery job
+    The worker runs in another process, so there is no condition to wait on -
+    poll the result backend and send a message when the status changes
+    """
+    last_status = None
+    last_sent = time.monotonic()
+    while True:
+        status = current_status(job_id)
+        if status is None:
+            yield f"data: {app.json.dumps({'error': 'Job not found'})}\n\n"
+            return
+        
+        if status != last_status:
+            yield f"data: {app.json.dumps(status)}\n\n"
+            last_status = status
+            last_sent = time.monotonic()
+            
+            if status['status'] in FINISHED_STATES:
+                return
+        elif time.monotonic() - last_sent >= KEEP_ALIVE_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        
+        time.sleep(CELERY_POLL_INTERVAL)
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    """Download processed file"""
+    """
+    Download processed file
+    Conditional responses give us ETag/Range support, so a repeat download
+    can be a 304 and an interrupted one can resume where it stopped
+    """
     try:
-        file_path = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-        if os.path.exists(file_path):
-            return send_file(
-                file_path,
-                as_attachment=True,
-                download_name=f'processed_ticket_{datetime.now().strftime("%Y%m%d")}.docx'
-            )
-        else:
-            return jsonify({'error': 'File not found'}), 404
+        # Absolute path - Flask would otherwise resolve it against the app folder
+        return send_from_directory(
+            os.path.abspath(app.config['OUTPUT_FOLDER']),
+            filename,
+            as_attachment=True,
+            download_name=f'processed_ticket_{datetime.now().strftime("%Y%m%d")}.docx',
+            conditional=True,
+            etag=True
+        )
+    except NotFound:
+        return jsonify({'error': 'File not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/history')
 def get_history():
     """Get processing history"""
-    history = []
-    
-    # Get recent jobs from status
-    for job_id, status in processing_status.items():
-        if status['status'] == 'completed':
-            history.append({
+    # Celery jobs land here once a /status or /events request sees them finish
+    # Already newest first and capped at 10 - no scan, no sort
+    with status_lock:
+        history = [
+            {
                 'job_id': job_id,
-                'timestamp': status.get('timestamp', 'Unknown'),
-                'status': status['status'],
-                'output_file': status.get('output_file', '')
-            })
-    
-    # Sort by timestamp
-    history.sort(key=lambda x: x['timestamp'], reverse=True)
+                'timestamp': timestamp,
+                'status': 'completed',
+                'output_file': output_file
+            }
+            for timestamp, job_id, output_file in completed_jobs
+        ]
     
-    return jsonify(history[:10])  # Last 10 jobs
+    return jsonify(history)
 
 if __name__ == '__main__':
     print("🚀 Starting Ticket Filler Web Application...")
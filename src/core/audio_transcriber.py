@@ -1,101 +1,187 @@
 import os
+import re
 import subprocess
 from pathlib import Path
-import whisper
+import numpy as np
+import ctranslate2
+from faster_whisper import WhisperModel
 import json
-from typing import Dict, List, Tuple
-import tempfile
+from typing import Dict, List, Optional, Tuple, Union
+
+try:
+    from json_cache import CACHE_ROOT, content_hasher, load_cached, store_cached
+except ImportError:
+    from .json_cache import CACHE_ROOT, content_hasher, load_cached, store_cached
+
+DEFAULT_CACHE_DIR = CACHE_ROOT / 'transcriptions'
+
+# RE2 matches in linear time (DFA) instead of Python's backtracking engine
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+
+def _compile(pattern: str, ignore_case: bool = False):
+    """Compile with RE2 when installed, falling back to the standard re module"""
+    if RE2_AVAILABLE:
+        return re2.compile(('(?i)' if ignore_case else '') + pattern)
+    return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+
+
+# Entity patterns are compiled once at import, one regex per entity type
+_MONTHS = r'(?:January|February|March|April|May|June|July|August|September|October|November|December)'
+
+_DATE_RE = _compile(
+    r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b'
+    r'|\b' + _MONTHS + r'\s+\d{1,2},?\s+\d{4}\b'
+    r'|\b\d{1,2}\s+' + _MONTHS + r'\s+\d{4}\b',
+    ignore_case=True
+)
+_EMAIL_RE = _compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_RE = _compile(
+    r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
+    r'|\(\d{3}\)\s*\d{3}[-.]?\d{4}'
+    r'|\b\d{10}\b'
+)
+_NUMBER_RE = _compile(r'\b\d{2,}\b')
 
 class AudioTranscriber:
     """Handles audio extraction and transcription from various file formats"""
     
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", cache_dir: Optional[str] = None,
+                 max_cache_entries: int = 500, cpu_threads: Optional[int] = None):
         """
         Initialize the transcriber with Whisper model
         
         Args:
             model_size: Size of Whisper model - tiny, base, small, medium, large
+            cache_dir: Where to cache transcriptions, keyed by file content
+            max_cache_entries: Least recently used entries beyond this are deleted
+            cpu_threads: Threads for CPU inference - defaults to every core,
+                lower it when several transcribers run side by side
         """
-        print(f"Loading Whisper model: {model_size}")
-        self.model = whisper.load_model(model_size)
+        self.model_size = model_size
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_cache_entries < 1:
+            raise ValueError("max_cache_entries must be at least 1")
+        self.max_cache_entries = max_cache_entries
+        
+        # Pick the fastest device we have - GPU first, CPU as fallback
+        if ctranslate2.get_cuda_device_count() > 0:
+            self.device = "cuda"
+            self.compute_type = "int8_float16"
+        else:
+            self.device = "cpu"
+            self.compute_type = "int8"
+        
+        # faster-whisper runs Whisper on CTranslate2 with int8 quantized weights
+        print(f"Loading Whisper model: {model_size} ({self.device}, {self.compute_type})")
+        self.model = WhisperModel(
+            model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=cpu_threads or os.cpu_count() or 1
+        )
         self.supported_formats = ['.mp4', '.mp3', '.wav', '.m4a', '.avi', '.mov']
         
-    def extract_audio_from_video(self, video_path: str, output_path: str = None) -> str:
+        self._warm_up()
+        
+    def _warm_up(self):
+        """
+        Run the model once on a second of silence
+        This triggers cuDNN autotuning now instead of on the first real job
+        """
+        silence = np.zeros(16000, dtype=np.float32)  # 1 second at 16kHz
+        segments, _ = self.model.transcribe(silence, language="en")
+        list(segments)  # Segments are lazy - consume them to run the model
+        
+    def extract_audio_from_video(self, video_path: str) -> np.ndarray:
         """
         Extract audio from video file using ffmpeg
+        Teaching: We stream raw PCM from ffmpeg straight into memory,
+        so nothing is written to (and read back from) a temp file
         
         Args:
             video_path: Path to video file
-            output_path: Optional output path for audio file
             
         Returns:
-            Path to extracted audio file
+            Mono 16kHz float32 audio samples, ready for Whisper
         """
-        if output_path is None:
-            # Create temporary file for audio
-            temp_dir = tempfile.gettempdir()
-            output_path = os.path.join(temp_dir, "extracted_audio.wav")
-        
         try:
-            # Use ffmpeg to extract audio
+            # Use ffmpeg to extract audio and write it to stdout
             cmd = [
                 'ffmpeg',
+                '-nostdin',
                 '-i', video_path,
+                '-f', 's16le',   # Raw 16-bit PCM, no WAV header
                 '-acodec', 'pcm_s16le',
                 '-ar', '16000',  # 16kHz sample rate for Whisper
                 '-ac', '1',      # Mono audio
-                '-y',            # Overwrite output file
-                output_path
+                'pipe:1'         # Write to stdout
             ]
             
             # Run ffmpeg
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True)
             
             if result.returncode != 0:
-                print(f"FFmpeg error: {result.stderr}")
-                raise Exception(f"Failed to extract audio: {result.stderr}")
+                stderr = result.stderr.decode(errors='replace')
+                print(f"FFmpeg error: {stderr}")
+                raise Exception(f"Failed to extract audio: {stderr}")
             
-            return output_path
+            # Convert 16-bit PCM to the [-1, 1] floats Whisper expects
+            audio = np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+            return audio
             
         except FileNotFoundError:
             raise Exception("FFmpeg not found. Please install FFmpeg and add it to PATH")
         except Exception as e:
             raise Exception(f"Audio extraction failed: {str(e)}")
     
-    def transcribe_audio(self, audio_path: str) -> Dict:
+    def transcribe_audio(self, audio: Union[str, np.ndarray]) -> Dict:
         """
         Transcribe audio file using Whisper
         
         Args:
-            audio_path: Path to audio file
+            audio: Path to audio file, or 16kHz mono float32 samples
             
         Returns:
             Dictionary containing transcription and metadata
         """
-        print(f"Transcribing audio file: {audio_path}")
+        if isinstance(audio, np.ndarray):
+            print(f"Transcribing {len(audio) / 16000:.1f}s of extracted audio")
+        else:
+            print(f"Transcribing audio file: {audio}")
         
-        # Transcribe with Whisper
-        result = self.model.transcribe(
-            audio_path,
-            fp16=False,  # Use FP32 for better compatibility
+        # Transcribe with Whisper (it accepts a path or a numpy array)
+        # Silero VAD cuts out silent stretches so the model only sees speech
+        # (phone recordings of traffic stops are often half silence)
+        raw_segments, info = self.model.transcribe(
+            audio,
             language="en",  # Specify English for better accuracy
-            task="transcribe"
+            task="transcribe",
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=500)
         )
         
-        # Extract segments with timestamps
+        # Extract segments with timestamps (decoding happens as we iterate)
         segments = []
-        for segment in result.get("segments", []):
+        texts = []
+        for segment in raw_segments:
+            texts.append(segment.text)
             segments.append({
-                "start": segment["start"],
-                "end": segment["end"],
-                "text": segment["text"].strip(),
-                "confidence": segment.get("avg_logprob", 0)
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text.strip(),
+                "confidence": segment.avg_logprob
             })
         
         return {
-            "text": result["text"].strip(),
+            "text": "".join(texts).strip(),
             "segments": segments,
-            "language": result.get("language", "en"),
+            "language": info.language,
             "duration": segments[-1]["end"] if segments else 0
         }
     
@@ -114,27 +200,47 @@ class AudioTranscriber:
         if file_ext not in self.supported_formats:
             raise ValueError(f"Unsupported file format: {file_ext}")
         
+        # Re-uploads of the same recording skip Whisper entirely
+        cache_path = self.cache_dir / f"{self._content_hash(media_path)}.json"
+        cached = self._load_cached(cache_path)
+        if cached is not None:
+            print(f"Using cached transcription for: {media_path}")
+            return cached
+        
         # Check if it's a video file that needs audio extraction
         video_formats = ['.mp4', '.avi', '.mov']
         
         if file_ext in video_formats:
-            # Extract audio first
+            # Extract audio first (streamed into memory, no temp file)
             print(f"Extracting audio from video: {media_path}")
-            audio_path = self.extract_audio_from_video(media_path)
+            audio = self.extract_audio_from_video(media_path)
             
-            try:
-                # Transcribe the extracted audio
-                result = self.transcribe_audio(audio_path)
-            finally:
-                # Clean up temporary audio file
-                if os.path.exists(audio_path) and "temp" in audio_path:
-                    os.remove(audio_path)
+            # Transcribe the extracted audio
+            result = self.transcribe_audio(audio)
         else:
             # Direct audio file
             result = self.transcribe_audio(media_path)
         
+        self._store_cached(cache_path, result)
         return result
     
+    def _content_hash(self, media_path: str) -> str:
+        """Hash the file contents (64KB at a time) together with the model size"""
+        hasher = content_hasher()
+        hasher.update(self.model_size.encode())
+        with open(media_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
+    def _load_cached(self, cache_path: Path) -> Optional[Dict]:
+        """Return a cached transcription, marking it as recently used"""
+        return load_cached(cache_path)
+    
+    def _store_cached(self, cache_path: Path, result: Dict):
+        """Write a transcription to the cache and evict the oldest entries"""
+        store_cached(cache_path, result, self.max_cache_entries)
+    
     def extract_entities(self, text: str) -> Dict[str, List[str]]:
         """
         Extract common entities from transcribed text
@@ -146,49 +252,21 @@ class AudioTranscriber:
         Returns:
             Dictionary of entity types and their values
         """
-        import re
-        
+        # dict.fromkeys de-duplicates in one pass and keeps first-seen order,
+        # so the earliest date mentioned stays first
         entities = {
-            "dates": [],
-            "emails": [],
-            "phone_numbers": [],
+            # Extract dates (simple patterns)
+            "dates": list(dict.fromkeys(_DATE_RE.findall(text))),
+            # Extract emails
+            "emails": list(dict.fromkeys(_EMAIL_RE.findall(text))),
+            # Extract phone numbers
+            "phone_numbers": list(dict.fromkeys(_PHONE_RE.findall(text))),
             "names": [],
             "addresses": [],
-            "numbers": []
+            # Extract numbers (for things like SSN, employee ID, etc.)
+            "numbers": list(dict.fromkeys(_NUMBER_RE.findall(text)))
         }
         
-        # Extract dates (simple patterns)
-        date_patterns = [
-            r'\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b',
-            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{4}\b',
-            r'\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}\b'
-        ]
-        
-        for pattern in date_patterns:
-            entities["dates"].extend(re.findall(pattern, text, re.IGNORECASE))
-        
-        # Extract emails
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        entities["emails"].extend(re.findall(email_pattern, text))
-        
-        # Extract phone numbers
-        phone_patterns = [
-            r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            r'\(\d{3}\)\s*\d{3}[-.]?\d{4}',
-            r'\b\d{10}\b'
-        ]
-        
-        for pattern in phone_patterns:
-            entities["phone_numbers"].extend(re.findall(pattern, text))
-        
-        # Extract numbers (for things like SSN, employee ID, etc.)
-        number_pattern = r'\b\d{2,}\b'
-        entities["numbers"].extend(re.findall(number_pattern, text))
-        
-        # Remove duplicates
-        for key in entities:
-            entities[key] = list(set(entities[key]))
-        
         return entities
     
     def save_transcription(self, transcription: Dict, output_path: str):
@@ -9,13 +9,14 @@ Key Concepts:
 3. Text boxes can be positioned absolutely in DOCX
 """
 
+import copy
 import cv2
 import numpy as np
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import parse_xml
-from docx.oxml.ns import nsdecls
+from docx.oxml.ns import nsdecls, qn
 from PIL import Image
 import io
 
@@ -30,6 +31,14 @@ class DocxCreator:
         # We'll calculate these based on the image
         self.pixels_per_inch_x = None
         self.pixels_per_inch_y = None
+        self._twips_per_px_x = None
+        self._twips_per_px_y = None
+        
+        # Frame properties shared by every text box - parsed once, copied per box
+        self._frame_template = parse_xml(
+            f'<w:framePr {nsdecls("w")} w:hAnchor="page" w:vAnchor="page" '
+            f'w:xAlign="left" w:yAlign="top" w:wrap="around"/>'
+        )
         
     def calculate_scaling(self, image_width, image_height):
         """
@@ -42,6 +51,10 @@ class DocxCreator:
         self.pixels_per_inch_x = image_width / self.page_width_inches
         self.pixels_per_inch_y = image_height / self.page_height_inches
         
+        # DOCX positions are in twips (1440 per inch) - go straight from pixels
+        self._twips_per_px_x = 1440.0 / self.pixels_per_inch_x
+        self._twips_per_px_y = 1440.0 / self.pixels_per_inch_y
+        
         print(f"  Image size: {image_width} x {image_height} pixels")
         print(f"  Page size: {self.page_width_inches} x {self.page_height_inches} inches")
         print(f"  Scale: {self.pixels_per_inch_x:.1f} x {self.pixels_per_inch_y:.1f} pixels/inch")
@@ -52,16 +65,39 @@ class DocxCreator:
         y_inches = y_pixels / self.pixels_per_inch_y
         return x_inches, y_inches
     
+    def elements_to_twips(self, elements):
+        """
+        Convert many elements' boxes to twips at once
+        Teaching: NumPy does all the multiplications in one go instead of one by one
+        
+        Returns:
+            Integer array of shape (N, 4) holding x, y, width, height in twips
+        """
+        boxes = np.array(
+            [(e.x, e.y, e.width, e.height) for e in elements],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        scale = np.array([self._twips_per_px_x, self._twips_per_px_y,
+                          self._twips_per_px_x, self._twips_per_px_y])
+        return (boxes * scale).astype(np.int64)
+    
     def add_positioned_textbox(self, doc, x_pixels, y_pixels, width_pixels, height_pixels, text=""):
         """
         Add a text box at a specific position
         Teaching: DOCX allows absolute positioning using frames
         """
-        # Convert pixels to inches
-        x_inches, y_inches = self.pixels_to_inches(x_pixels, y_pixels)
-        width_inches = width_pixels / self.pixels_per_inch_x
-        height_inches = height_pixels / self.pixels_per_inch_y
-        
+        # Convert pixels to twips (1440 = twips per inch, the DOCX unit)
+        return self._add_frame(
+            doc,
+            int(x_pixels * self._twips_per_px_x),
+            int(y_pixels * self._twips_per_px_y),
+            int(width_pixels * self._twips_per_px_x),
+            int(height_pixels * self._twips_per_px_y),
+            text
+        )
+    
+    def _add_frame(self, doc, x_twips, y_twips, width_twips, height_twips, text=""):
+        """Add a framed paragraph at a position already converted to twips"""
         # Create a paragraph
         paragraph = doc.add_paragraph()
         
@@ -74,19 +110,11 @@ class DocxCreator:
         
         # Create frame for positioning (this is the tricky part!)
         # Frames allow absolute positioning in DOCX
-        frame_props = parse_xml(f'''
-            <w:framePr {nsdecls('w')}
-                w:w="{int(width_inches * 1440)}"
-                w:h="{int(height_inches * 1440)}"
-                w:x="{int(x_inches * 1440)}"
-                w:y="{int(y_inches * 1440)}"
-                w:hAnchor="page"
-                w:vAnchor="page"
-                w:xAlign="left"
-                w:yAlign="top"
-                w:wrap="around"/>
-        ''')
-        # Note: 1440 = twips per inch (DOCX unit)
+        frame_props = copy.deepcopy(self._frame_template)
+        frame_props.set(qn('w:w'), str(width_twips))
+        frame_props.set(qn('w:h'), str(height_twips))
+        frame_props.set(qn('w:x'), str(x_twips))
+        frame_props.set(qn('w:y'), str(y_twips))
         
         paragraph._element.get_or_add_pPr().append(frame_props)
         
@@ -162,15 +190,11 @@ class DocxCreator:
                       if e.element_type in ['field', 'text_field']]
         
         print(f"\n  Adding {len(text_fields)} text fields...")
-        for i, field in enumerate(text_fields):
+        field_boxes = self.elements_to_twips(text_fields)
+        for i, (x, y, w, h) in enumerate(field_boxes):
             # Add a text box with sample text
             sample_text = f"Field {i+1}"
-            self.add_positioned_textbox(
-                doc, 
-                field.x, field.y,
-                field.width, field.height,
-                sample_text
-            )
+            self._add_frame(doc, x, y, w, h, sample_text)
         
         # Add checkboxes
         checkboxes = [e for e in form_structure['all_elements'] 
@@ -205,45 +229,41 @@ class SimpleDocxCreator:
         doc = Document()
         doc.add_heading('Recreated Form - Simple Version', 0)
         
-        # Group elements by approximate Y position (rows)
-        elements_by_row = {}
+        elements = form_structure['all_elements']
         
-        for element in form_structure['all_elements']:
-            # Round Y to nearest 30 pixels (group into rows)
-            row_y = (element.y // 30) * 30
-            
-            if row_y not in elements_by_row:
-                elements_by_row[row_y] = []
-            
-            elements_by_row[row_y].append(element)
-        
-        # Sort rows by Y position
-        sorted_rows = sorted(elements_by_row.keys())
+        # Group elements by approximate Y position (rows)
+        # Round Y down to nearest 30 pixels, then sort by row and X in one step
+        xs = np.fromiter((e.x for e in elements), dtype=np.int64, count=len(elements))
+        ys = np.fromiter((e.y for e in elements), dtype=np.int64, count=len(elements))
+        rows = (ys // 30) * 30
+        order = np.lexsort((xs, rows))  # Last key sorts first: row, then X
         
         # Create document content row by row
-        for row_y in sorted_rows:
-            elements = elements_by_row[row_y]
-            
-            # Sort elements in row by X position
-            elements.sort(key=lambda e: e.x)
-            
-            # Create paragraph for this row
-            para = doc.add_paragraph()
+        para = None
+        current_row = None
+        for idx in order:
+            element = elements[idx]
             
-            for element in elements:
-                if element.element_type == 'checkbox':
-                    para.add_run('☐ ')
-                elif element.element_type in ['field', 'text_field']:
-                    # Add underlined space for field
-                    run = para.add_run('_' * 20 + ' ')
-                    run.font.underline = True
-                else:
-                    # Skip lines for now
-                    continue
+            if rows[idx] != current_row:
+                # Add line break between rows
+                if para is not None and para.text.strip():  # Only if row has content
+                    para.add_run('\n')
+                
+                # Create paragraph for this row
+                para = doc.add_paragraph()
+                current_row = rows[idx]
             
-            # Add line break between rows
-            if para.text.strip():  # Only if row has content
-                para.add_run('\n')
+            if element.element_type == 'checkbox':
+                para.add_run('☐ ')
+            elif element.element_type in ['field', 'text_field']:
+                # Add underlined space for field
+                run = para.add_run('_' * 20 + ' ')
+                run.font.underline = True
+            # Skip lines for now
+        
+        # Line break after the last row too
+        if para is not None and para.text.strip():
+            para.add_run('\n')
         
         doc.save(output_path)
         print(f"✅ Simple form saved to: {output_path}")
@@ -263,8 +283,7 @@ if __name__ == "__main__":
     
     if ticket_path.exists():
         # Process image
-        preprocessor = ImagePreprocessor()
-        preprocessor.debug = False  # Turn off debug windows
+        preprocessor = ImagePreprocessor(debug=False)  # Turn off debug windows
         results = preprocessor.process_ticket_image(ticket_path)
         
         # Detect structure  
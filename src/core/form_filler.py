@@ -1,9 +1,94 @@
 import re
+import functools
+from dataclasses import dataclass, asdict
 from typing import Dict, List, Any
 from docx import Document
 from datetime import datetime
 import json
 
+# Patterns are compiled once at import instead of on every field
+_NAME_PATTERNS = [
+    re.compile(r"(?:my name is|I am|this is)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})", re.IGNORECASE),
+    re.compile(r"(?:name|full name)\s*(?:is|:)\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})", re.IGNORECASE),
+]
+_US_STATES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas',
+    'CA': 'California', 'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware',
+    'FL': 'Florida', 'GA': 'Georgia', 'HI': 'Hawaii', 'ID': 'Idaho',
+    'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa', 'KS': 'Kansas',
+    'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi',
+    'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada',
+    'NH': 'New Hampshire', 'NJ': 'New Jersey', 'NM': 'New Mexico', 'NY': 'New York',
+    'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma',
+    'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah',
+    'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia',
+    'WI': 'Wisconsin', 'WY': 'Wyoming',
+}
+_STATE_ABBREVIATIONS = {name.lower(): abbr for abbr, name in _US_STATES.items()}
+# Full names match in any case; abbreviations only in capitals, so words
+# like "in", "or" and "me" in a transcript aren't taken for states
+_STATE_PATTERN = (
+    r'\b(?:(?P<state_name>' + '|'.join(sorted(_US_STATES.values(), key=len, reverse=True)) + r')'
+    r'|(?-i:(?P<state_abbr>' + '|'.join(_US_STATES) + r')))\b'
+)
+# City, zip and state in one alternation, so a single scan finds all three.
+# The city branch is a lookahead: it consumes nothing, so a state named
+# inside the city phrase is still seen, just as a separate search would
+_ADDRESS_RE = re.compile(
+    r'(?=(?:city|town)\s*(?:is|:)\s*(?P<city>[A-Za-z\s]+?)(?:,|\.|$))'
+    r'|(?P<zip>\b\d{5}\b)'
+    r'|' + _STATE_PATTERN,
+    re.IGNORECASE
+)
+_SSN_RE = re.compile(r'\d{3}-?\d{2}-?\d{4}')  # Used with fullmatch
+_JOB_PATTERNS = {
+    'department': re.compile(r"(?:department|dept|division)\s*(?:is|:)\s*([A-Za-z\s]+?)(?:,|\.|$)", re.IGNORECASE),
+    'position': re.compile(r"(?:position|title|role)\s*(?:is|:)\s*([A-Za-z\s]+?)(?:,|\.|$)", re.IGNORECASE),
+    'salary': re.compile(r"(?:salary|pay|compensation)\s*(?:is|:)\s*\$?([0-9,]+)", re.IGNORECASE)
+}
+# Field types answered straight from one extracted_data list (first item wins)
+_DIRECT = {'date': 'dates', 'email': 'emails', 'phone': 'phone_numbers'}
+_UNDERSCORES_RE = re.compile(r'_{3,}')
+_EMPTY_BRACKETS_RE = re.compile(r'\[\s*\]')
+_TABLE_LOC_RE = re.compile(r'table_(\d+)_row_(\d+)')
+
+@dataclass
+class FilledField:
+    """A form field that was filled in, and with what"""
+    # __slots__ by hand rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('label', 'type', 'value')
+    label: str
+    type: str
+    value: str
+
+@functools.lru_cache(maxsize=32)
+def _address_components(text: str) -> Dict[str, str]:
+    """First city, state and zip in a text - cached, as each is asked for in turn"""
+    components = {}
+    for match in _ADDRESS_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'state_name':
+            components.setdefault('state', _STATE_ABBREVIATIONS[match.group(kind).lower()])
+        elif kind == 'state_abbr':
+            components.setdefault('state', match.group(kind))
+        else:
+            components.setdefault(kind, match.group(kind).strip())
+        
+        if len(components) == 3:
+            break
+    return components
+
+@functools.lru_cache(maxsize=1024)
+def _label_patterns(field_label: str):
+    """Compile the two context patterns for a label, at most once per label"""
+    escaped = re.escape(field_label)
+    return (
+        re.compile(rf"{escaped}\s*(?:is|:|=)\s*([^\n,.]+)", re.IGNORECASE),
+        re.compile(rf"(?:my|the|our)\s+{escaped}\s*(?:is|:|=)\s*([^\n,.]+)", re.IGNORECASE),
+    )
+
 class FormFiller:
     """Fills detected form fields with extracted information"""
     
@@ -25,6 +110,15 @@ class FormFiller:
             'position': ['position', 'title', 'job title', 'role', 'designation'],
             'salary': ['salary', 'wage', 'pay', 'compensation', 'income']
         }
+        
+        # Every (keyword, field type) pair in one flat list, longest keyword first,
+        # so the most specific keyword wins ("zip code" over "city" in "Zip code/City")
+        self._sorted_keywords = sorted(
+            ((keyword, field_type)
+             for field_type, keywords in self.field_keywords.items()
+             for keyword in keywords),
+            key=lambda pair: -len(pair[0])
+        )
     
     def match_field_to_data(self, field_label: str, extracted_data: Dict, 
                           transcription_text: str) -> Any:
@@ -42,8 +136,13 @@ class FormFiller:
         field_label_lower = field_label.lower()
         
         # Try to match based on field type keywords
-        for field_type, keywords in self.field_keywords.items():
-            if any(keyword in field_label_lower for keyword in keywords):
+        for keyword, field_type in self._sorted_keywords:
+            if keyword in field_label_lower:
+                # Dates, emails and phones need no context - take the first one found
+                if field_type in _DIRECT:
+                    values = extracted_data.get(_DIRECT[field_type])
+                    return values[0] if values else None
+                
                 return self._get_value_for_field_type(
                     field_type, 
                     field_label, 
@@ -58,15 +157,10 @@ class FormFiller:
                                  extracted_data: Dict, text: str) -> Any:
         """Get value based on field type"""
         
-        if field_type == 'date' and extracted_data.get('dates'):
-            # Return the first date found (can be improved with context)
-            return extracted_data['dates'][0]
-        
-        elif field_type == 'email' and extracted_data.get('emails'):
-            return extracted_data['emails'][0]
-        
-        elif field_type == 'phone' and extracted_data.get('phone_numbers'):
-            return extracted_data['phone_numbers'][0]
+        if field_type in _DIRECT:
+            # Return the first date/email/phone found (can be improved with context)
+            values = extracted_data.get(_DIRECT[field_type])
+            return values[0] if values else None
         
         elif field_type == 'name':
             # Extract name from context
@@ -89,13 +183,8 @@ class FormFiller:
     def _extract_from_context(self, field_label: str, text: str) -> str:
         """Extract value from context using the field label"""
         # Look for patterns like "field_label is X" or "field_label: X"
-        patterns = [
-            rf"{re.escape(field_label)}\s*(?:is|:|=)\s*([^\n,.]+)",
-            rf"(?:my|the|our)\s+{re.escape(field_label)}\s*(?:is|:|=)\s*([^\n,.]+)",
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _label_patterns(field_label):
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
@@ -104,13 +193,8 @@ class FormFiller:
     def _extract_name_from_context(self, text: str) -> str:
         """Extract name from transcription context"""
         # Look for name patterns
-        patterns = [
-            r"(?:my name is|I am|this is)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",
-            r"(?:name|full name)\s*(?:is|:)\s*([A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})",
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _NAME_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
@@ -119,35 +203,16 @@ class FormFiller:
     def _extract_address_component(self, component: str, text: str) -> str:
         """Extract specific address component"""
         # This is a simplified version - can be enhanced with NLP
-        if component == 'city':
-            # Look for city patterns
-            pattern = r"(?:city|town)\s*(?:is|:)\s*([A-Za-z\s]+?)(?:,|\.|$)"
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        
-        elif component == 'state':
-            # Look for state abbreviations or full names
-            states = ['CA', 'NY', 'TX', 'FL', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI']  # Add more
-            for state in states:
-                if state in text.upper():
-                    return state
-        
-        elif component == 'zip':
-            # Look for 5-digit zip codes
-            pattern = r'\b\d{5}\b'
-            match = re.search(pattern, text)
-            if match:
-                return match.group(0)
-        
-        return None
+        # City, state and zip all come from one cached scan of the text
+        return _address_components(text).get(component)
     
     def _find_specific_number(self, number_type: str, numbers: List[str]) -> str:
         """Find specific type of number from list"""
         if number_type == 'ssn':
             # SSN pattern: XXX-XX-XXXX or 9 digits
+            # Only 9 to 11 characters can be an SSN - check that before the regex
             for num in numbers:
-                if re.match(r'^\d{3}-?\d{2}-?\d{4}$', num):
+                if 9 <= len(num) <= 11 and _SSN_RE.fullmatch(num):
                     return num
         
         elif number_type == 'employee_id':
@@ -160,15 +225,9 @@ class FormFiller:
     
     def _extract_job_info(self, info_type: str, text: str) -> str:
         """Extract job-related information"""
-        patterns = {
-            'department': r"(?:department|dept|division)\s*(?:is|:)\s*([A-Za-z\s]+?)(?:,|\.|$)",
-            'position': r"(?:position|title|role)\s*(?:is|:)\s*([A-Za-z\s]+?)(?:,|\.|$)",
-            'salary': r"(?:salary|pay|compensation)\s*(?:is|:)\s*\$?([0-9,]+)"
-        }
-        
-        pattern = patterns.get(info_type)
+        pattern = _JOB_PATTERNS.get(info_type)
         if pattern:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
@@ -194,6 +253,14 @@ class FormFiller:
         filled_fields = []
         unfilled_fields = []
         
+        # python-docx builds these lists anew on every access - fetch them once
+        paragraphs = doc.paragraphs
+        tables = doc.tables
+        
+        # New text per paragraph index, so several fields in one paragraph
+        # build on each other and each paragraph is rewritten only once
+        paragraph_texts = {}
+        
         # Process each field
         for field in fields:
             field_label = field['label']
@@ -209,22 +276,24 @@ class FormFiller:
             if value:
                 # Fill the field in the document
                 success = self._fill_field_in_document(
-                    doc, 
+                    paragraphs, 
+                    tables, 
                     field, 
-                    value
+                    value, 
+                    paragraph_texts
                 )
                 
                 if success:
-                    filled_fields.append({
-                        'label': field_label,
-                        'type': field_type,
-                        'value': value
-                    })
+                    filled_fields.append(FilledField(field_label, field_type, value))
                 else:
                     unfilled_fields.append(field_label)
             else:
                 unfilled_fields.append(field_label)
         
+        # Write each changed paragraph once
+        for paragraph_idx, new_text in paragraph_texts.items():
+            paragraphs[paragraph_idx].text = new_text
+        
         # Save the filled document
         doc.save(output_path)
         
@@ -234,7 +303,7 @@ class FormFiller:
         confidence = filled_count / total_fields if total_fields > 0 else 0
         
         return {
-            'filled_fields': filled_fields,
+            'filled_fields': [asdict(filled) for filled in filled_fields],
             'unfilled_fields': unfilled_fields,
             'total_fields': total_fields,
             'filled_count': filled_count,
@@ -242,14 +311,18 @@ class FormFiller:
             'output_path': output_path
         }
     
-    def _fill_field_in_document(self, doc: Document, field: Dict, value: str) -> bool:
+    def _fill_field_in_document(self, paragraphs: List, tables: List, field: Dict,
+                                value: str, paragraph_texts: Dict[int, str]) -> bool:
         """
         Fill a specific field in the document
         
         Args:
-            doc: Document object
+            paragraphs: The document's paragraphs
+            tables: The document's tables
             field: Field information
             value: Value to fill
+            paragraph_texts: Pending paragraph rewrites, updated in place
+                (fill_form writes them to the document at the end)
             
         Returns:
             True if successful, False otherwise
@@ -257,43 +330,56 @@ class FormFiller:
         try:
             # Handle paragraph-based fields
             if isinstance(field.get('paragraph_idx'), int):
-                paragraph = doc.paragraphs[field['paragraph_idx']]
-                original_text = field['original_text']
+                paragraph_idx = field['paragraph_idx']
+                paragraph = paragraphs[paragraph_idx]
                 
-                # Replace underscores or brackets with the value
-                if '___' in original_text:
-                    new_text = re.sub(r'_{3,}', value, original_text, count=1)
-                elif '[  ]' in original_text or '[ ]' in original_text:
-                    # For checkboxes, mark as checked
-                    if field['field_type'] == 'checkbox':
-                        new_text = original_text.replace('[ ]', '[X]').replace('[  ]', '[X]')
-                    else:
-                        new_text = re.sub(r'\[[\s]*\]', value, original_text, count=1)
-                else:
+                # Fill the blank inside its own run when we can - setting
+                # paragraph.text drops every run and its formatting
+                run_idx = field.get('run_idx')
+                if (paragraph_idx not in paragraph_texts
+                        and isinstance(run_idx, int) and 0 <= run_idx < len(paragraph.runs)):
+                    run = paragraph.runs[run_idx]
+                    new_run_text = self._replace_blank(run.text, field, value)
+                    if new_run_text is not None:
+                        run.text = new_run_text
+                        return True
+                
+                # Otherwise rewrite the whole paragraph, starting from
+                # any earlier field's changes to it
+                original_text = paragraph_texts.get(paragraph_idx, paragraph.text)
+                new_text = self._replace_blank(original_text, field, value)
+                if new_text is None:
                     # Try to append value after label
                     new_text = original_text + ' ' + value
                 
-                # Update paragraph text
-                paragraph.text = new_text
+                # Update paragraph text (written once per paragraph by fill_form)
+                paragraph_texts[paragraph_idx] = new_text
                 return True
             
             # Handle table-based fields
             elif 'table_' in str(field.get('paragraph_idx', '')):
                 # Parse table location
                 location = field['paragraph_idx']
-                match = re.match(r'table_(\d+)_row_(\d+)', location)
+                match = _TABLE_LOC_RE.match(location)
                 if match:
                     table_idx = int(match.group(1))
                     row_idx = int(match.group(2))
                     cell_idx = field['run_idx']
                     
                     # Update table cell
-                    table = doc.tables[table_idx]
+                    table = tables[table_idx]
                     cell = table.rows[row_idx].cells[cell_idx]
                     
-                    # Replace underscores or append value
+                    # Replace underscores inside their run, keeping its formatting
+                    for cell_paragraph in cell.paragraphs:
+                        for run in cell_paragraph.runs:
+                            if '___' in run.text:
+                                run.text = _UNDERSCORES_RE.sub(value, run.text, count=1)
+                                return True
+                    
+                    # Underscores split across runs, or none - rewrite the cell
                     if '___' in cell.text:
-                        cell.text = re.sub(r'_{3,}', value, cell.text, count=1)
+                        cell.text = _UNDERSCORES_RE.sub(value, cell.text, count=1)
                     else:
                         cell.text = cell.text + ' ' + value
                     
@@ -305,6 +391,19 @@ class FormFiller:
             print(f"Error filling field {field['label']}: {str(e)}")
             return False
 
+    
+    def _replace_blank(self, text: str, field: Dict, value: str):
+        """Put value into the first blank (underscores or brackets) - None if there is none"""
+        # Replace underscores or brackets with the value
+        if '___' in text:
+            return _UNDERSCORES_RE.sub(value, text, count=1)
+        if '[  ]' in text or '[ ]' in text:
+            # For checkboxes, mark as checked
+            if field['field_type'] == 'checkbox':
+                return text.replace('[ ]', '[X]').replace('[  ]', '[X]')
+            return _EMPTY_BRACKETS_RE.sub(value, text, count=1)
+        return None
+
 
 # Example usage
 if __name__ == "__main__":
@@ -27,6 +27,45 @@ class FormElement:
         """How this object appears when printed"""
         return f"{self.element_type}(x={self.x}, y={self.y}, w={self.width}, h={self.height})"
 
+# Element types as small integers, for the structured arrays below
+ELEMENT_TYPES = ('hline', 'vline', 'box', 'checkbox', 'field', 'text_field')
+_TYPE_IDS = {name: i for i, name in enumerate(ELEMENT_TYPES)}
+
+# Many elements stored as one array with a column per attribute,
+# so whole columns can be computed, filtered and sliced at once
+_ELEM_DTYPE = np.dtype([
+    ('type', 'u1'), ('x', 'i4'), ('y', 'i4'),
+    ('w', 'i4'), ('h', 'i4'), ('conf', 'f8')
+])
+
+def make_element_array(element_type, x, y, w, h, confidence=1.0):
+    """Build a structured element array from columns - scalars fill a whole column
+    (x sets the length, so it must be an array)"""
+    n = len(x)
+    arr = np.empty(n, dtype=_ELEM_DTYPE)
+    arr['type'] = _TYPE_IDS[element_type]
+    arr['x'] = x
+    arr['y'] = y
+    arr['w'] = w
+    arr['h'] = h
+    arr['conf'] = confidence
+    return arr
+
+def elements_to_array(elements):
+    """Pack a list of FormElements into a structured array"""
+    return np.array(
+        [(_TYPE_IDS[e.element_type], e.x, e.y, e.width, e.height, e.confidence)
+         for e in elements],
+        dtype=_ELEM_DTYPE
+    )
+
+def array_to_elements(arr):
+    """Unpack a structured array into FormElements for the rest of the pipeline"""
+    return [
+        FormElement(ELEMENT_TYPES[t], x, y, w, h, conf)
+        for t, x, y, w, h, conf in arr.tolist()
+    ]
+
 class FormStructureDetector:
     """Detects the structure of forms - lines, boxes, fields"""
     
@@ -42,38 +81,8 @@ class FormStructureDetector:
         """
         print("\n📏 Detecting lines in the form...")
         
-        # Create copies for visualization
-        horizontal_viz = np.copy(binary_image)
-        vertical_viz = np.copy(binary_image)
-        
-        # Method 1: Morphological operations (like erosion and dilation)
-        # These help us find lines by their shape
-        
-        # Kernel for detecting horizontal lines
-        # This is like a filter that's 1 pixel tall and 40 pixels wide
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-        
-        # Find horizontal lines
-        horizontal_lines = cv2.morphologyEx(
-            binary_image, 
-            cv2.MORPH_OPEN,  # Opening = erosion followed by dilation
-            horizontal_kernel,
-            iterations=1
-        )
-        
-        # Kernel for vertical lines (1 pixel wide, 40 pixels tall)
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
-        
-        # Find vertical lines
-        vertical_lines = cv2.morphologyEx(
-            binary_image,
-            cv2.MORPH_OPEN,
-            vertical_kernel,
-            iterations=1
-        )
-        
-        # Method 2: Hough Line Transform (finds lines mathematically)
-        # This is more accurate but also more complex
+        # Hough Line Transform (finds lines mathematically)
+        # Only its output becomes FormElements
         
         # Detect edges first (lines are edges!)
         edges = cv2.Canny(binary_image, 50, 150)
@@ -93,48 +102,73 @@ class FormStructureDetector:
         vertical_elements = []
         
         if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                
-                # Calculate line properties
-                length = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-                angle = np.abs(np.arctan2(y2-y1, x2-x1) * 180 / np.pi)
-                
-                # Classify as horizontal or vertical
-                if angle < 10 or angle > 170:  # Horizontal
-                    element = FormElement(
-                        element_type='hline',
-                        x=min(x1, x2),
-                        y=min(y1, y2),
-                        width=int(abs(x2-x1)),
-                        height=2  # Thin line
-                    )
-                    horizontal_elements.append(element)
-                    
-                    # Draw for visualization
-                    if self.debug:
-                        cv2.line(horizontal_viz, (x1,y1), (x2,y2), 128, 2)
-                        
-                elif 80 < angle < 100:  # Vertical
-                    element = FormElement(
-                        element_type='vline',
-                        x=min(x1, x2),
-                        y=min(y1, y2),
-                        width=2,  # Thin line
-                        height=int(abs(y2-y1))
-                    )
-                    vertical_elements.append(element)
-                    
-                    # Draw for visualization
-                    if self.debug:
-                        cv2.line(vertical_viz, (x1,y1), (x2,y2), 128, 2)
+            # Classify every line at once instead of one at a time
+            # (N, 1, 4) on OpenCV 4, (N, 4) on 5 - reshape handles both
+            pts = lines.reshape(-1, 4).astype(np.int64)  # x1, y1, x2, y2
+            dx = pts[:, 2] - pts[:, 0]
+            dy = pts[:, 3] - pts[:, 1]
+            abs_dx = np.abs(dx)
+            abs_dy = np.abs(dy)
+            left = np.minimum(pts[:, 0], pts[:, 2])
+            top = np.minimum(pts[:, 1], pts[:, 3])
+            
+            # Within ~10 degrees of flat or upright, tested on integer slopes
+            # instead of angles: 1/6 is about tan(9.5 degrees)
+            h_mask = abs_dy * 6 <= abs_dx  # Horizontal
+            v_mask = abs_dx * 6 <= abs_dy  # Vertical
+            
+            # Fill whole columns at once - lines are 2 pixels thick
+            h_array = make_element_array('hline', left[h_mask], top[h_mask],
+                                         abs_dx[h_mask], 2)
+            v_array = make_element_array('vline', left[v_mask], top[v_mask],
+                                         2, abs_dy[v_mask])
+            horizontal_elements = array_to_elements(h_array)
+            vertical_elements = array_to_elements(v_array)
         
         print(f"  Found {len(horizontal_elements)} horizontal lines")
         print(f"  Found {len(vertical_elements)} vertical lines")
         
         if self.debug:
+            # Copies for visualization - only made when they will be shown
+            horizontal_viz = np.copy(binary_image)
+            vertical_viz = np.copy(binary_image)
+            
+            for e in horizontal_elements:
+                cv2.line(horizontal_viz, (e.x, e.y), (e.x + e.width, e.y), 128, 2)
+            for e in vertical_elements:
+                cv2.line(vertical_viz, (e.x, e.y), (e.x, e.y + e.height), 128, 2)
+            
             cv2.imshow("Horizontal Lines", horizontal_viz)
             cv2.imshow("Vertical Lines", vertical_viz)
+            
+            # For comparison: morphological operations (like erosion and dilation)
+            # find lines by their shape. Two full-image passes, so debug only
+            
+            # Kernel for detecting horizontal lines
+            # This is like a filter that's 1 pixel tall and 40 pixels wide
+            horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
+            
+            # Find horizontal lines
+            horizontal_lines = cv2.morphologyEx(
+                binary_image, 
+                cv2.MORPH_OPEN,  # Opening = erosion followed by dilation
+                horizontal_kernel,
+                iterations=1
+            )
+            
+            # Kernel for vertical lines (1 pixel wide, 40 pixels tall)
+            vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
+            
+            # Find vertical lines
+            vertical_lines = cv2.morphologyEx(
+                binary_image,
+                cv2.MORPH_OPEN,
+                vertical_kernel,
+                iterations=1
+            )
+            
+            cv2.imshow("Horizontal Lines (morphology)", horizontal_lines)
+            cv2.imshow("Vertical Lines (morphology)", vertical_lines)
             cv2.waitKey(1)
         
         return horizontal_elements, vertical_elements
@@ -153,54 +187,53 @@ class FormStructureDetector:
             cv2.CHAIN_APPROX_SIMPLE
         )
         
-        boxes = []
-        checkboxes = []
+        min_size, max_size = self.checkbox_size_range
         
-        # Visualization image
-        viz_image = cv2.cvtColor(binary_image, cv2.COLOR_GRAY2BGR)
+        rects = np.array(
+            [cv2.boundingRect(c) for c in contours], dtype=np.int32
+        ).reshape(-1, 4)
         
-        for contour in contours:
-            # Get bounding rectangle
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Calculate properties
-            area = w * h
-            aspect_ratio = w / h if h > 0 else 0
-            
-            # Is it square-ish? (aspect ratio close to 1)
-            is_square = 0.7 < aspect_ratio < 1.3
-            
-            # Is it the right size for a checkbox?
-            min_size, max_size = self.checkbox_size_range
-            is_checkbox_size = min_size < w < max_size and min_size < h < max_size
+        # Most contours are specks and glyphs - drop every rectangle too small
+        # to pass either size test below before classifying the rest
+        w, h = rects[:, 2], rects[:, 3]
+        rects = rects[(w > min(min_size, 50)) & (h > min(min_size, 15))]
+        x, y, w, h = rects.T
+        
+        # Calculate properties for every rectangle at once
+        aspect_ratio = w / np.maximum(h, 1)
+        
+        # Is it square-ish? (aspect ratio close to 1)
+        is_square = (0.7 < aspect_ratio) & (aspect_ratio < 1.3)
+        
+        # Is it the right size for a checkbox?
+        is_checkbox_size = ((min_size < w) & (w < max_size) &
+                            (min_size < h) & (h < max_size))
+        
+        # Likely a checkbox
+        cb_mask = is_square & is_checkbox_size
+        # Likely a text field box
+        field_mask = ~cb_mask & (w > 50) & (h > 15) & (h < 50)
+        
+        checkbox_array = make_element_array('checkbox', x[cb_mask], y[cb_mask],
+                                            w[cb_mask], h[cb_mask], confidence=0.8)
+        box_array = make_element_array('field', x[field_mask], y[field_mask],
+                                       w[field_mask], h[field_mask], confidence=0.7)
+        checkboxes = array_to_elements(checkbox_array)
+        boxes = array_to_elements(box_array)
+        
+        if self.debug:
+            # Visualization image
+            viz_image = cv2.cvtColor(binary_image, cv2.COLOR_GRAY2BGR)
             
-            if is_square and is_checkbox_size:
-                # Likely a checkbox
-                checkbox = FormElement(
-                    element_type='checkbox',
-                    x=x, y=y, width=w, height=h,
-                    confidence=0.8
-                )
-                checkboxes.append(checkbox)
-                
-                # Draw in red
-                if self.debug:
-                    cv2.rectangle(viz_image, (x,y), (x+w,y+h), (0,0,255), 2)
-                    cv2.putText(viz_image, "CB", (x,y-5), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0,0,255), 1)
+            # Draw checkboxes in red
+            for cb in checkboxes:
+                cv2.rectangle(viz_image, (cb.x, cb.y), (cb.x+cb.width, cb.y+cb.height), (0,0,255), 2)
+                cv2.putText(viz_image, "CB", (cb.x, cb.y-5), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.3, (0,0,255), 1)
             
-            elif w > 50 and h > 15 and h < 50:
-                # Likely a text field box
-                box = FormElement(
-                    element_type='field',
-                    x=x, y=y, width=w, height=h,
-                    confidence=0.7
-                )
-                boxes.append(box)
-                
-                # Draw in green
-                if self.debug:
-                    cv2.rectangle(viz_image, (x,y), (x+w,y+h), (0,255,0), 2)
+            # Draw text fields in green
+            for box in boxes:
+                cv2.rectangle(viz_image, (box.x, box.y), (box.x+box.width, box.y+box.height), (0,255,0), 2)
         
         print(f"  Found {len(checkboxes)} checkboxes")
         print(f"  Found {len(boxes)} potential text fields")
@@ -211,10 +244,14 @@ class FormStructureDetector:
         
         return boxes, checkboxes
     
-    def identify_fillable_fields(self, binary_image, horizontal_lines, vertical_lines):
+    def identify_fillable_fields(self, binary_image, horizontal_lines, vertical_lines,
+                                 integral=None):
         """
         Step 3: Find areas where text should be entered
         Teaching: We look for blank spaces near labels
+        
+        integral is the black-pixel integral image from black_pixel_integral,
+        computed here if not given
         """
         print("\n✏️ Identifying fillable fields...")
         
@@ -222,47 +259,56 @@ class FormStructureDetector:
         # Also look for blank rectangular areas
         
         height, width = binary_image.shape
-        fillable_fields = []
-        
-        # Create visualization
-        viz_image = cv2.cvtColor(binary_image, cv2.COLOR_GRAY2BGR)
         
         # Look for horizontal lines that might be fill lines
-        for line in horizontal_lines:
-            # Check if there's text above this line (label)
-            region_above = binary_image[
-                max(0, line.y-30):line.y,
-                line.x:line.x+line.width
-            ]
-            
-            # If there's text above, this might be a fill line
-            text_pixels = np.sum(region_above == 0)  # Count black pixels
-            if text_pixels > 50:  # Some text exists
-                field = FormElement(
-                    element_type='text_field',
-                    x=line.x,
-                    y=line.y-25,  # Place field above line
-                    width=line.width,
-                    height=25,
-                    confidence=0.9
-                )
-                fillable_fields.append(field)
-                
-                # Draw in blue
-                if self.debug:
-                    cv2.rectangle(viz_image, 
-                                (field.x, field.y), 
-                                (field.x + field.width, field.y + field.height),
-                                (255, 0, 0), 2)
+        lines = elements_to_array(horizontal_lines)
+        xs, ys, ws = lines['x'], lines['y'], lines['w']
+        
+        if integral is None:
+            integral = self.black_pixel_integral(binary_image)
+        
+        # Check if there's text above each line (label) - the 30 rows above it
+        x0 = np.clip(xs, 0, width)
+        x1 = np.clip(xs + ws, 0, width)
+        y0 = np.clip(ys - 30, 0, height)
+        y1 = np.clip(ys, 0, height)
+        text_pixels = (integral[y1, x1] - integral[y0, x1]
+                       - integral[y1, x0] + integral[y0, x0])  # Count black pixels
+        
+        # If there's text above, this might be a fill line
+        has_text = text_pixels > 50  # Some text exists
+        
+        # Place each field above its line
+        fields = make_element_array('text_field', xs[has_text], ys[has_text] - 25,
+                                    ws[has_text], 25, confidence=0.9)
+        fillable_fields = array_to_elements(fields)
         
         print(f"  Found {len(fillable_fields)} fillable fields")
         
         if self.debug:
+            # Create visualization
+            viz_image = cv2.cvtColor(binary_image, cv2.COLOR_GRAY2BGR)
+            
+            # Draw in blue
+            for field in fillable_fields:
+                cv2.rectangle(viz_image, 
+                            (field.x, field.y), 
+                            (field.x + field.width, field.y + field.height),
+                            (255, 0, 0), 2)
+            
             cv2.imshow("Fillable Fields", viz_image)
             cv2.waitKey(1)
         
         return fillable_fields
     
+    def black_pixel_integral(self, binary_image):
+        """
+        Integral image of the black pixels
+        Teaching: after one pass over the image, the number of black pixels
+        in any rectangle takes just 4 lookups
+        """
+        return cv2.integral((binary_image == 0).view(np.uint8))
+    
     def analyze_form_structure(self, binary_image):
         """
         Main method: Detect complete form structure
@@ -277,8 +323,12 @@ class FormStructureDetector:
         # Step 2: Detect boxes and checkboxes
         boxes, checkboxes = self.detect_boxes_and_checkboxes(binary_image)
         
+        # Black-pixel counts for the whole image - only the field search needs
+        # them, so they stay out of the returned structure
+        integral = self.black_pixel_integral(binary_image)
+        
         # Step 3: Identify fillable fields
-        fields = self.identify_fillable_fields(binary_image, h_lines, v_lines)
+        fields = self.identify_fillable_fields(binary_image, h_lines, v_lines, integral)
         
         # Combine all elements
         all_elements = h_lines + v_lines + boxes + checkboxes + fields
@@ -311,7 +361,7 @@ if __name__ == "__main__":
     from pathlib import Path
     
     # Load and preprocess image
-    preprocessor = ImagePreprocessor()
+    preprocessor = ImagePreprocessor(debug=True)
     ticket_path = Path("../../data/sample_images/ticket.jpg")
     
     if ticket_path.exists():
@@ -0,0 +1,67 @@
+# src/core/json_cache.py
+"""
+On-disk JSON cache shared by the OCR and transcription steps
+Entries are files named by a content hash; the least recently used are evicted
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+# BLAKE3 hashes with SIMD; blake2b from the standard library is the fallback
+try:
+    from blake3 import blake3 as content_hasher
+except ImportError:
+    from hashlib import blake2b as content_hasher
+
+# Each cache gets its own folder under here
+CACHE_ROOT = Path(os.environ.get('QUICKCITE_CACHE_DIR', '~/.quickcite_cache')).expanduser()
+
+
+def load_cached(cache_path):
+    """Return a cached entry (None when missing), marking it as recently used"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    try:
+        os.utime(cache_path)  # Bump mtime so LRU eviction keeps it
+    except FileNotFoundError:
+        pass  # Another worker evicted it since we read it - still a hit
+    return data
+
+
+# A full cache is trimmed to this fraction of max_entries, so the stat-and-sort
+# runs once per max_entries / 10 writes instead of on every write
+EVICT_TO = 0.9
+
+
+def store_cached(cache_path, data, max_entries):
+    """Write an entry, evicting the oldest ones once there are over max_entries"""
+    # Write to a temp name first so other workers never read half a file
+    # (pid and thread id, so no two writers ever share a temp file)
+    tmp_path = cache_path.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+
+    # Counting names is cheap - only an overfull cache pays for stat and sort
+    with os.scandir(cache_path.parent) as it:
+        count = sum(1 for entry in it if entry.name.endswith('.json'))
+    if count <= max_entries:
+        return
+
+    entries = sorted(cache_path.parent.glob('*.json'), key=_mtime)
+    keep = max(1, int(max_entries * EVICT_TO))  # The entry just written is newest
+    for old_entry in entries[:len(entries) - keep]:
+        old_entry.unlink(missing_ok=True)
+
+
+def _mtime(path):
+    """Modification time, or 0 for an entry another worker already removed"""
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
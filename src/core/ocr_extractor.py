@@ -1,15 +1,105 @@
 import cv2
 import numpy as np
 import pytesseract
-from PIL import Image
 from dataclasses import dataclass
 from typing import List, Tuple, Dict
 import re
 import os
 import platform
+import tempfile
+import threading
+from dataclasses import asdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
 
-# Configure Tesseract path for Windows
-if platform.system() == 'Windows':
+# tesserocr runs Tesseract in-process: the model loads once, not once per image
+try:
+    from tesserocr import PyTessBaseAPI, RIL, PSM, OEM, iterate_level
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+try:
+    from json_cache import CACHE_ROOT, content_hasher, load_cached, store_cached
+except ImportError:
+    from .json_cache import CACHE_ROOT, content_hasher, load_cached, store_cached
+
+DEFAULT_CACHE_DIR = CACHE_ROOT / 'ocr'
+
+# Numba compiles the line grouping scan to machine code
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _line_starts_kernel(sorted_ys, tolerance):
+        """
+        Where each line starts in a sorted array of y positions
+        A line runs until a y at least `tolerance` below the line's first y
+        """
+        starts = np.empty(len(sorted_ys), np.int64)
+        starts[0] = 0
+        count = 1
+        line_y = sorted_ys[0]
+        for i in range(1, len(sorted_ys)):
+            if sorted_ys[i] - line_y >= tolerance:
+                starts[count] = i
+                count += 1
+                line_y = sorted_ys[i]
+        return starts[:count]
+    
+    # Compile now (or load from the on-disk cache) instead of on the first ticket
+    try:
+        _line_starts_kernel(np.zeros(1, np.int64), 10)
+    except ModuleNotFoundError:
+        # The cache remembers the module name it was built under ("ocr_extractor"
+        # or "core.ocr_extractor") and won't load under the other one
+        _line_starts_kernel = njit(_line_starts_kernel.py_func)
+        _line_starts_kernel(np.zeros(1, np.int64), 10)
+
+# Tesseract models: tessdata_fast reads about 3x faster than tessdata_best for a
+# small accuracy cost, which printed ticket forms can afford. Put eng.traineddata from
+# github.com/tesseract-ocr/tessdata_fast (or tessdata_best) in TESSDATA_ROOT/fast (or /best)
+TESSDATA_ROOT = Path(os.environ.get(
+    'QUICKCITE_TESSDATA_DIR', Path(__file__).resolve().parents[2] / 'data' / 'tessdata'
+))
+
+def tessdata_dir(quality):
+    """Model folder for quality 'fast' or 'best' - None means Tesseract's installed models"""
+    path = TESSDATA_ROOT / quality
+    return path if (path / 'eng.traineddata').exists() else None
+
+# Common label keywords, as one case-insensitive pattern
+# (substring matches, like `keyword in text.upper()`)
+LABEL_KEYWORDS = [
+    'NAME', 'DATE', 'ADDRESS', 'CITY', 'STATE', 'ZIP',
+    'LICENSE', 'PLATE', 'VIOLATION', 'OFFICER', 'BADGE',
+    'COURT', 'TICKET', 'CASE', 'SPEED', 'LOCATION'
+]
+_LABEL_KEYWORD_RE = re.compile('|'.join(map(re.escape, LABEL_KEYWORDS)), re.IGNORECASE)
+
+# Ticket field patterns, compiled once - each field takes its own first match
+# (one alternation would let a match for one field hide another's, e.g. date and court_date)
+_TICKET_PATTERNS = {
+    field: re.compile(pattern, re.IGNORECASE) for field, pattern in {
+        'ticket_number': r'TICKET\s*#?\s*(\d+)',
+        'case_number': r'CASE\s*#?\s*(\d+)',
+        'date': r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+        'time': r'(\d{1,2}:\d{2}\s*[APM]{2})',
+        'speed': r'(\d+)\s*MPH',
+        'violation_code': r'([A-Z]{2,4}\s*\d+\.\d+)',
+        'badge_number': r'BADGE\s*#?\s*(\d+)',
+        'court_date': r'COURT.*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
+    }.items()
+}
+
+# Configure Tesseract path - PYTESSERACT_CMD wins, then the usual Windows folders
+tesseract_cmd = os.environ.get('PYTESSERACT_CMD')
+if tesseract_cmd is None and platform.system() == 'Windows':
     # Try to find Tesseract
     possible_paths = [
         r'C:\Program Files\Tesseract-OCR\tesseract.exe',
@@ -19,18 +109,24 @@ if platform.system() == 'Windows':
         r'C:\tesseract\tesseract.exe',
     ]
     
-    for path in possible_paths:
-        if os.path.exists(path):
-            pytesseract.pytesseract.tesseract_cmd = path
-            print(f"✅ Found Tesseract at: {path}")
-            break
+    tesseract_cmd = next((path for path in possible_paths if os.path.exists(path)), None)
+    if tesseract_cmd:
+        print(f"✅ Found Tesseract at: {tesseract_cmd}")
+        # Remember it, so reloads and worker processes skip the search
+        os.environ['PYTESSERACT_CMD'] = tesseract_cmd
     else:
         print("⚠️ Tesseract not found. OCR will not work!")
         print("Download from: https://github.com/UB-Mannheim/tesseract/wiki")
 
+if tesseract_cmd:
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
 @dataclass
 class TextBlock:
     """Represents a piece of text found in the image"""
+    # Slots instead of a per-instance __dict__ - a dense page has hundreds of these
+    __slots__ = ('text', 'x', 'y', 'width', 'height', 'confidence')
+    
     text: str
     x: int
     y: int
@@ -41,19 +137,112 @@ class TextBlock:
     def __repr__(self):
         return f"TextBlock('{self.text[:20]}...', x={self.x}, y={self.y}, conf={self.confidence:.2f})"
 
+def text_blocks_to_arrays(text_blocks):
+    """
+    Columns of a list of TextBlocks (structure of arrays)
+    Teaching: geometry checks on whole arrays beat looping over objects
+    
+    Returns:
+        {'xy': (N, 2) int64 array, 'wh': (N, 2) int64 array,
+         'conf': (N,) float64 array, 'text': [str]}
+    """
+    boxes = np.array(
+        [(b.x, b.y, b.width, b.height) for b in text_blocks], dtype=np.int64
+    ).reshape(-1, 4)
+    return {
+        'xy': boxes[:, :2],
+        'wh': boxes[:, 2:],
+        'conf': np.fromiter((b.confidence for b in text_blocks), dtype=np.float64,
+                            count=len(text_blocks)),
+        'text': [b.text for b in text_blocks]
+    }
+
 class OCRExtractor:
     """Extracts text from images using multiple OCR strategies"""
     
-    def __init__(self):
+    def __init__(self, cache_dir=None, max_cache_entries=2000, debug=None, psm=6,
+                 quality='fast'):
+        """
+        Args:
+            cache_dir: Where to cache OCR results, keyed by image content
+            max_cache_entries: Least recently used entries beyond this are deleted
+            debug: Show the OCR visualization - defaults to QUICKCITE_DEBUG=1
+            psm: Tesseract page segmentation mode - 6 for a block of text,
+                7 for a crop holding a single line (much faster on small crops)
+            quality: 'fast' or 'best' Tesseract models (see TESSDATA_ROOT)
+        """
+        if debug is None:
+            debug = os.environ.get('QUICKCITE_DEBUG') == '1'
+        self.debug = debug
+        
         # Configure Tesseract path for Windows (adjust if needed)
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
         
         # OCR configuration options
-        self.tesseract_config = '--oem 3 --psm 6'
-        # OEM 3 = Default OCR Engine Mode
-        # PSM 6 = Uniform block of text
+        self.psm = psm
+        self.tesseract_config = f'--oem 1 --psm {psm}'
+        # OEM 1 = LSTM engine only (OEM 3 can run the legacy engine as well)
+        # PSM 6 = Uniform block of text, PSM 7 = Single text line
+        
+        # Models for the chosen quality, when they're installed under TESSDATA_ROOT
+        self.tessdata_dir = tessdata_dir(quality)
+        tessdata_arg = ''
+        if self.tessdata_dir is not None:
+            tessdata_arg = f' --tessdata-dir "{self.tessdata_dir}"'
+        else:
+            print(f"  No {quality} models in {TESSDATA_ROOT / quality} - using Tesseract's own")
+        self.tesseract_config += tessdata_arg
+        
+        # Field crops hold a single line of text
+        self.line_config = '--oem 1 --psm 7' + tessdata_arg
         
         self.min_confidence = 30  # Minimum confidence to keep text
+        self.max_glyph_height = 40  # Taller text gets the image halved before OCR
+        
+        # Unchanged tickets skip OCR entirely - hashing is ~100x cheaper than reading
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_cache_entries < 1:
+            raise ValueError("max_cache_entries must be at least 1")
+        self.max_cache_entries = max_cache_entries
+        
+        # Persistent in-process engines with the same settings, when available
+        # (lent out one caller at a time - a tesserocr engine can't be shared
+        # between threads, and idle ones are reused whichever thread asks next)
+        self._tesserocr_ok = TESSEROCR_AVAILABLE
+        self._idle_apis = []
+        self._apis_lock = threading.Lock()
+        
+    @contextmanager
+    def _engine(self):
+        """
+        Lend out an idle tesserocr engine, creating one when all are busy
+        Yields None without tesserocr. There are never more engines than
+        threads reading at the same time, however many threads come and go
+        """
+        with self._apis_lock:
+            api = self._idle_apis.pop() if self._idle_apis else None
+        
+        if api is None and self._tesserocr_ok:
+            try:
+                # tesserocr wants the tessdata path with a trailing separator
+                path_arg = {'path': f"{self.tessdata_dir}{os.sep}"} if self.tessdata_dir else {}
+                api = PyTessBaseAPI(lang='eng', psm=self.psm, oem=OEM.LSTM_ONLY, **path_arg)
+            except RuntimeError as e:
+                # Usually tessdata can't be found - the pytesseract path still works
+                print(f"⚠️ tesserocr unavailable ({e}), using pytesseract")
+                self._tesserocr_ok = False
+        
+        try:
+            yield api
+        finally:
+            if api is not None:
+                with self._apis_lock:
+                    self._idle_apis.append(api)
+        
+    def __del__(self):
+        for api in getattr(self, '_idle_apis', []):
+            api.End()
         
     def extract_text_with_positions(self, image):
         """
@@ -62,42 +251,234 @@ class OCRExtractor:
         """
         print("\n🔤 Extracting text with positions...")
         
-        # Tesseract expects PIL Image or numpy array
-        if isinstance(image, np.ndarray):
-            # Convert to PIL if needed
-            if len(image.shape) == 3:  # Color image
-                pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            else:  # Grayscale
-                pil_image = Image.fromarray(image)
-        else:
-            pil_image = image
+        cache_path = self.cache_dir / f"{self._content_hash(image)}.json"
+        text_blocks = self._load_cached(cache_path)
+        if text_blocks is not None:
+            print(f"  Using cached OCR: {len(text_blocks)} text blocks")
+            return text_blocks
         
-        # Get detailed OCR data (not just text)
-        ocr_data = pytesseract.image_to_data(
-            pil_image, 
-            output_type=pytesseract.Output.DICT,
-            config=self.tesseract_config
-        )
+        text_blocks = self._run_ocr(image)
+        self._store_cached(cache_path, text_blocks)
+        
+        print(f"  Found {len(text_blocks)} text blocks")
+        return text_blocks
+    
+    def _run_ocr(self, image):
+        """OCR one image (no cache) into TextBlocks"""
+        image, factor = self._shrink_for_ocr(image)
+        
+        # Get detailed OCR data (not just text) - one (text, conf, x, y, w, h) per word
+        with self._engine() as api:
+            if api is not None:
+                words = self._words_from_tesserocr(api, image)
+            else:
+                words = self._words_from_pytesseract(image)
+        
+        return self._words_to_text_blocks(self._scale_words(words, factor))
+    
+    def _shrink_for_ocr(self, image):
+        """
+        Halve images whose text is much taller than Tesseract needs
+        Teaching: Tesseract reads best around 300 DPI; bigger glyphs only add
+        pixels, and its LSTM takes time in proportion to the pixel count
+        
+        Returns:
+            (image to OCR, factor that maps its coordinates back to the original)
+        """
+        if not isinstance(image, np.ndarray):
+            return image, 1
+        
+        # Median height of the ink blobs - mostly letters, so it's the glyph height
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT][stats[1:, cv2.CC_STAT_AREA] >= 10]
+        if len(heights) == 0 or np.median(heights) <= self.max_glyph_height:
+            return image, 1
+        
+        print(f"  Text is {np.median(heights):.0f} px tall - halving the image for OCR")
+        return cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA), 2
+    
+    def _scale_words(self, words, factor):
+        """Map word boxes from a shrunk image back to the original's pixels"""
+        if factor == 1:
+            return words
+        return [
+            (text, confidence, x * factor, y * factor, width * factor, height * factor)
+            for text, confidence, x, y, width, height in words
+        ]
+    
+    def extract_text_batch(self, images):
+        """
+        Extract text with positions from many images
+        Teaching: starting Tesseract costs about as much as reading a small
+        ticket, so pay for it once per batch instead of once per image
+        
+        Returns:
+            One list of TextBlocks per image, in the same order
+        """
+        print(f"\n🔤 Extracting text from {len(images)} images...")
+        
+        # Cached images first - only the rest go through Tesseract
+        cache_paths = [self.cache_dir / f"{self._content_hash(image)}.json" for image in images]
+        results = [self._load_cached(cache_path) for cache_path in cache_paths]
+        missing = [i for i, text_blocks in enumerate(results) if text_blocks is None]
+        print(f"  {len(images) - len(missing)} cached, {len(missing)} to read")
+        
+        if missing:
+            # The persistent engine has no startup cost left to share
+            with self._engine() as api:
+                use_engine = api is not None
+            if use_engine:
+                fresh = [self._run_ocr(images[i]) for i in missing]
+            else:
+                fresh = self._run_ocr_list([images[i] for i in missing])
+            
+            for i, text_blocks in zip(missing, fresh):
+                results[i] = text_blocks
+                self._store_cached(cache_paths[i], text_blocks)
         
-        # Process OCR results
+        print(f"  Found {sum(map(len, results))} text blocks")
+        return results
+    
+    def extract_field_text(self, image, form_elements):
+        """
+        OCR only the inside of each form field, as a single line of text
+        Teaching: a field holds one line, so PSM 7 on the field alone skips the
+        page layout analysis and every pixel outside the fields
+        
+        Returns:
+            TextBlocks in page coordinates
+        """
+        print("\n🔤 Reading text inside form fields...")
+        
+        # Field boxes, clipped to the image
+        height, width = image.shape[:2]
+        rois = []
+        for element in form_elements:
+            if element.element_type in ['field', 'text_field']:
+                x0, y0 = max(element.x, 0), max(element.y, 0)
+                x1 = min(element.x + element.width, width)
+                y1 = min(element.y + element.height, height)
+                if x1 > x0 and y1 > y0:
+                    rois.append((x0, y0, x1 - x0, y1 - y0))
+        
+        if not rois:
+            return []
+        
+        with self._engine() as api:
+            if api is not None:
+                # Set the page once and point the engine at one rectangle at a time -
+                # it reports boxes in page coordinates, so no crops and no offsets
+                pixels = self._set_image(api, image)  # Keep the pixels alive while reading
+                api.SetPageSegMode(PSM.SINGLE_LINE)
+                try:
+                    words = []
+                    for x, y, w, h in rois:
+                        api.SetRectangle(x, y, w, h)
+                        api.Recognize()
+                        words.extend(self._read_words(api))
+                finally:
+                    api.SetPageSegMode(self.psm)
+                field_blocks = self._words_to_text_blocks(words)
+            else:
+                # Every crop as one page of a single tesseract run, then shift the
+                # boxes from crop to page coordinates
+                crops = [image[y:y + h, x:x + w] for x, y, w, h in rois]
+                field_blocks = []
+                for (x, y, _, _), blocks in zip(
+                    rois, self._run_ocr_list(crops, config=self.line_config, shrink=False)
+                ):
+                    for block in blocks:
+                        block.x += x
+                        block.y += y
+                    field_blocks.extend(blocks)
+        
+        print(f"  Found {len(field_blocks)} text blocks in {len(rois)} fields")
+        return field_blocks
+    
+    def _run_ocr_list(self, images, config=None, shrink=True):
+        """OCR many images (no cache) with a single tesseract run"""
+        # One tesseract run over a list file - it reads each listed image as a page
+        with tempfile.TemporaryDirectory(prefix='quickcite_ocr_') as scratch:
+            image_paths = []
+            factors = []
+            for i, image in enumerate(images):
+                image, factor = self._shrink_for_ocr(image) if shrink else (image, 1)
+                image_path = os.path.join(scratch, f'{i:05d}.bmp')
+                self._write_image(image_path, image)
+                image_paths.append(image_path)
+                factors.append(factor)
+            
+            list_path = os.path.join(scratch, 'list.txt')
+            with open(list_path, 'w') as f:
+                f.write('\n'.join(image_paths) + '\n')
+            
+            ocr_data = pytesseract.image_to_data(
+                list_path,
+                output_type=pytesseract.Output.DICT,
+                config=config or self.tesseract_config
+            )
+        
+        # Split the rows back into images by page number (1-based)
+        words_per_image = [[] for _ in images]
+        for page, *word in zip(
+            ocr_data['page_num'], ocr_data['text'], map(float, ocr_data['conf']),
+            ocr_data['left'], ocr_data['top'],
+            ocr_data['width'], ocr_data['height']
+        ):
+            words_per_image[page - 1].append(word)
+        
+        return [
+            self._words_to_text_blocks(self._scale_words(words, factor))
+            for words, factor in zip(words_per_image, factors)
+        ]
+    
+    def _content_hash(self, image):
+        """Hash the pixels together with the settings that change what OCR returns"""
+        pixels = np.ascontiguousarray(image)
+        hasher = content_hasher()
+        hasher.update(
+            f"{pixels.shape}|{pixels.dtype}|{self.tesseract_config}|"
+            f"{self.min_confidence}|{self.max_glyph_height}".encode()
+        )
+        hasher.update(pixels)
+        return hasher.hexdigest()
+    
+    def _load_cached(self, cache_path):
+        """Return cached TextBlocks, marking the entry as recently used"""
+        rows = load_cached(cache_path)
+        if rows is None:
+            return None
+        return [TextBlock(**row) for row in rows]
+    
+    def _store_cached(self, cache_path, text_blocks):
+        """Write TextBlocks to the cache and evict the oldest entries"""
+        store_cached(cache_path, [asdict(block) for block in text_blocks],
+                     self.max_cache_entries)
+    
+    def _write_image(self, path, image):
+        """
+        Save an image for the tesseract command line
+        Teaching: BMP is uncompressed, so writing it costs a memory copy
+        instead of the PNG compression pytesseract would do
+        """
+        if isinstance(image, np.ndarray):
+            cv2.imwrite(path, image)  # OpenCV writes BGR images the right way round
+        else:
+            image.save(path)  # PIL picks the format from the extension
+    
+    def _words_to_text_blocks(self, words):
+        """Keep the confident, non-empty (text, conf, x, y, w, h) words as TextBlocks"""
         text_blocks = []
-        n_boxes = len(ocr_data['level'])
         
-        for i in range(n_boxes):
-            # Extract data for each detected element
-            confidence = float(ocr_data['conf'][i])
-            text = ocr_data['text'][i].strip()
+        for text, confidence, x, y, width, height in words:
+            text = text.strip()
             
             # Skip empty or low-confidence text
             if confidence < self.min_confidence or not text:
                 continue
             
-            # Get position
-            x = ocr_data['left'][i]
-            y = ocr_data['top'][i]
-            width = ocr_data['width'][i]
-            height = ocr_data['height'][i]
-            
             # Create text block
             block = TextBlock(
                 text=text,
@@ -107,154 +488,221 @@ class OCRExtractor:
             )
             text_blocks.append(block)
         
-        print(f"  Found {len(text_blocks)} text blocks")
         return text_blocks
     
-    def group_text_into_lines(self, text_blocks):
+    def _words_from_tesserocr(self, api, image):
+        """
+        Words from a persistent tesserocr engine
+        Teaching: no subprocess, no temp file, no model reload per image
+        """
+        pixels = self._set_image(api, image)  # Keep the pixels alive until Recognize
+        api.Recognize()
+        return self._read_words(api)
+    
+    def _set_image(self, api, image):
+        """Give tesserocr an image, returning the buffer it reads from"""
+        if isinstance(image, np.ndarray):
+            # Hand over the raw pixels - no PIL image, no encode/decode in between
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Tesseract wants RGB order
+            pixels = np.ascontiguousarray(image)
+            height, width = pixels.shape[:2]
+            bytes_per_pixel = 1 if pixels.ndim == 2 else pixels.shape[2]
+            buffer = pixels.tobytes()
+            api.SetImageBytes(buffer, width, height, bytes_per_pixel, width * bytes_per_pixel)
+            return buffer
+        api.SetImage(image)
+        return image
+    
+    def _read_words(self, api):
+        """(text, conf, x, y, w, h) for each word the engine just recognized"""
+        words = []
+        for word in iterate_level(api.GetIterator(), RIL.WORD):
+            bbox = word.BoundingBox(RIL.WORD)
+            if bbox is None:
+                continue
+            left, top, right, bottom = bbox
+            words.append((
+                word.GetUTF8Text(RIL.WORD) or '',
+                word.Confidence(RIL.WORD),
+                left, top, right - left, bottom - top
+            ))
+        return words
+    
+    def _words_from_pytesseract(self, image):
+        """Words from a tesseract subprocess (the fallback without tesserocr)"""
+        # Hand tesseract a BMP path ourselves - given an image object,
+        # pytesseract would write a compressed PNG first
+        fd, image_path = tempfile.mkstemp(prefix='quickcite_ocr_', suffix='.bmp')
+        os.close(fd)
+        try:
+            self._write_image(image_path, image)
+            ocr_data = pytesseract.image_to_data(
+                image_path, 
+                output_type=pytesseract.Output.DICT,
+                config=self.tesseract_config
+            )
+        finally:
+            os.remove(image_path)
+        return zip(
+            ocr_data['text'],
+            map(float, ocr_data['conf']),
+            ocr_data['left'], ocr_data['top'],
+            ocr_data['width'], ocr_data['height']
+        )
+    
+    def group_text_into_lines(self, text_blocks, arrays=None):
         """
         Group text blocks into lines
         Teaching: Words on the same line should be grouped together
+        
+        arrays is text_blocks_to_arrays(text_blocks), when the caller has it already
         """
         print("\n📏 Grouping text into lines...")
         
         if not text_blocks:
             return []
         
+        if arrays is None:
+            arrays = text_blocks_to_arrays(text_blocks)
+        xs, ys = arrays['xy'].T
+        
         # Sort by Y position (top to bottom)
-        sorted_blocks = sorted(text_blocks, key=lambda b: b.y)
+        order = np.argsort(ys, kind='stable')
+        sorted_ys = ys[order]
+        
+        # A line holds every block within 10 pixels below its first block
+        if NUMBA_AVAILABLE:
+            starts = _line_starts_kernel(sorted_ys, 10).tolist()
+        else:
+            # Each line's end is one binary search instead of a loop over blocks
+            starts = [0]
+            while True:
+                end = int(np.searchsorted(sorted_ys, sorted_ys[starts[-1]] + 10, side='left'))
+                if end == len(order):
+                    break
+                starts.append(end)
         
         lines = []
-        current_line = [sorted_blocks[0]]
-        current_y = sorted_blocks[0].y
-        
-        # Group blocks that are on similar Y positions
-        for block in sorted_blocks[1:]:
-            # If Y position is close (within 10 pixels), same line
-            if abs(block.y - current_y) < 10:
-                current_line.append(block)
-            else:
-                # Start new line
-                # Sort current line by X position (left to right)
-                current_line.sort(key=lambda b: b.x)
-                lines.append(current_line)
-                
-                current_line = [block]
-                current_y = block.y
-        
-        # Don't forget the last line
-        if current_line:
-            current_line.sort(key=lambda b: b.x)
-            lines.append(current_line)
+        for start, end in zip(starts, starts[1:] + [len(order)]):
+            line = order[start:end]
+            # Sort the line by X position (left to right)
+            line = line[np.argsort(xs[line], kind='stable')]
+            lines.append([text_blocks[i] for i in line.tolist()])
         
         print(f"  Grouped into {len(lines)} lines")
         return lines
     
-    def identify_labels_and_values(self, text_blocks, form_elements):
+    def identify_labels_and_values(self, text_blocks, form_elements, arrays=None):
         """
         Smart identification of what's a label vs. what's a value
         Teaching: Labels usually end with ':' or are near fields
+        
+        arrays is text_blocks_to_arrays(text_blocks), when the caller has it already
         """
         print("\n🏷️ Identifying labels and values...")
         
-        labels = []
-        values = []
+        if arrays is None:
+            arrays = text_blocks_to_arrays(text_blocks)
+        block_xs, block_ys = arrays['xy'].T
         
-        for block in text_blocks:
-            text = block.text
-            
-            # Common patterns for labels
-            is_label = False
-            
-            # Pattern 1: Ends with colon
-            if text.endswith(':'):
-                is_label = True
-            
-            # Pattern 2: Common label keywords
-            label_keywords = [
-                'NAME', 'DATE', 'ADDRESS', 'CITY', 'STATE', 'ZIP',
-                'LICENSE', 'PLATE', 'VIOLATION', 'OFFICER', 'BADGE',
-                'COURT', 'TICKET', 'CASE', 'SPEED', 'LOCATION'
-            ]
-            
-            if any(keyword in text.upper() for keyword in label_keywords):
-                is_label = True
-            
-            # Pattern 3: Near a form field
-            for element in form_elements:
-                if element.element_type in ['field', 'text_field']:
-                    # Is this text just above or to the left of a field?
-                    if (abs(block.y - element.y) < 30 and 
-                        block.x < element.x + element.width):
-                        is_label = True
-                        break
-            
-            if is_label:
-                labels.append(block)
-            else:
-                values.append(block)
+        # Pattern 1: Ends with colon / Pattern 2: Common label keywords
+        is_label = np.fromiter(
+            (text.endswith(':') or _LABEL_KEYWORD_RE.search(text) is not None
+             for text in arrays['text']),
+            dtype=bool, count=len(text_blocks)
+        )
+        
+        # Pattern 3: Near a form field
+        # Is this text just above or to the left of a field? Every block
+        # against every field in one broadcast (blocks down, fields across)
+        fields = np.array(
+            [(e.x, e.y, e.width) for e in form_elements
+             if e.element_type in ['field', 'text_field']],
+            dtype=np.int64
+        ).reshape(-1, 3)
+        field_xs, field_ys, field_ws = fields.T
+        near_field = (
+            (np.abs(block_ys[:, None] - field_ys[None, :]) < 30) &
+            (block_xs[:, None] < (field_xs + field_ws)[None, :])
+        ).any(axis=1)
+        is_label |= near_field
+        
+        labels = [block for block, label in zip(text_blocks, is_label.tolist()) if label]
+        values = [block for block, label in zip(text_blocks, is_label.tolist()) if not label]
         
         print(f"  Found {len(labels)} labels and {len(values)} values")
         return labels, values
     
-    def extract_ticket_information(self, image, form_structure):
+    def extract_ticket_information(self, image, form_structure, text_blocks=None,
+                                   read_fields=False):
         """
         Main method: Extract all information from ticket
         Returns structured data
+        
+        Pass text_blocks when the OCR already ran (see extract_text_batch).
+        read_fields=True also reads what is written inside each form field
+        (see extract_field_text) into 'field_blocks'.
         """
         print("\n" + "="*60)
         print("🎫 EXTRACTING TICKET INFORMATION")
         print("="*60)
         
         # Step 1: Extract all text with positions
-        text_blocks = self.extract_text_with_positions(image)
+        if text_blocks is None:
+            text_blocks = self.extract_text_with_positions(image)
+        
+        # Block geometry as arrays (structure of arrays), built once for every step
+        blocks_arr = text_blocks_to_arrays(text_blocks)
         
         # Step 2: Group into lines
-        text_lines = self.group_text_into_lines(text_blocks)
+        text_lines = self.group_text_into_lines(text_blocks, blocks_arr)
         
         # Step 3: Identify labels vs values
         all_elements = form_structure.get('all_elements', [])
-        labels, values = self.identify_labels_and_values(text_blocks, all_elements)
+        labels, values = self.identify_labels_and_values(text_blocks, all_elements, blocks_arr)
         
         # Step 4: Extract specific ticket information
-        ticket_info = self.parse_ticket_data(text_blocks)
+        # (the page's text as one string, joined once and returned for reuse)
+        all_text = ' '.join(block.text for block in text_blocks)
+        ticket_info = self.parse_ticket_data(text_blocks, all_text)
         
         # Step 5: Create visualization
         self.visualize_ocr_results(image, text_blocks, labels)
         
+        # Optional: what's filled in on the fields themselves
+        field_blocks = self.extract_field_text(image, all_elements) if read_fields else []
+        
         return {
+            'field_blocks': field_blocks,
             'text_blocks': text_blocks,
+            'text_blocks_arr': blocks_arr,
             'text_lines': text_lines,
             'labels': labels,
+            'labels_arr': text_blocks_to_arrays(labels),
             'values': values,
-            'ticket_info': ticket_info
+            'ticket_info': ticket_info,
+            'all_text': all_text
         }
     
-    def parse_ticket_data(self, text_blocks):
+    def parse_ticket_data(self, text_blocks, all_text=None):
         """
         Extract specific ticket information using patterns
         Teaching: Real-world text extraction uses patterns and heuristics
+        
+        all_text is the blocks' text joined with spaces, when the caller has it already
         """
         print("\n🔍 Parsing ticket data...")
         
         # Combine all text for pattern matching
-        all_text = ' '.join([block.text for block in text_blocks])
+        if all_text is None:
+            all_text = ' '.join(block.text for block in text_blocks)
         
         ticket_info = {}
         
         # Pattern matching for common ticket fields
-        patterns = {
-            'ticket_number': r'TICKET\s*#?\s*(\d+)',
-            'case_number': r'CASE\s*#?\s*(\d+)',
-            'date': r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            'time': r'(\d{1,2}:\d{2}\s*[APM]{2})',
-            'speed': r'(\d+)\s*MPH',
-            'violation_code': r'([A-Z]{2,4}\s*\d+\.\d+)',
-            'badge_number': r'BADGE\s*#?\s*(\d+)',
-            'court_date': r'COURT.*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-        }
-        
-        for field, pattern in patterns.items():
-            match = re.search(pattern, all_text, re.IGNORECASE)
+        for field, pattern in _TICKET_PATTERNS.items():
+            match = pattern.search(all_text)
             if match:
                 ticket_info[field] = match.group(1)
                 print(f"  Found {field}: {match.group(1)}")
@@ -265,34 +713,42 @@ class OCRExtractor:
         """
         Visualize what OCR found
         Teaching: Always verify OCR results visually
+        (debug only - it copies the whole image and opens a window)
         """
+        if not self.debug:
+            return image
+        
         # Create color image for visualization
         if len(image.shape) == 2:  # Grayscale
             viz_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
         else:
             viz_image = image.copy()
         
-        # Draw text blocks
-        for block in text_blocks:
-            # Labels in blue, others in green
-            color = (255, 0, 0) if block in labels else (0, 255, 0)
-            
-            # Draw rectangle
-            cv2.rectangle(
-                viz_image,
-                (block.x, block.y),
-                (block.x + block.width, block.y + block.height),
-                color, 1
-            )
-            
-            # Add confidence score
-            cv2.putText(
-                viz_image,
-                f"{block.confidence:.0f}%",
-                (block.x, block.y - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.3, color, 1
-            )
+        # Labels in blue, others in green - one polylines call per color
+        # (labels are looked up by identity: a set instead of a list scan per block)
+        label_ids = {id(block) for block in labels}
+        label_blocks = [block for block in text_blocks if id(block) in label_ids]
+        other_blocks = [block for block in text_blocks if id(block) not in label_ids]
+        for blocks, color in ((label_blocks, (255, 0, 0)), (other_blocks, (0, 255, 0))):
+            if blocks:
+                corners = np.array([
+                    [[b.x, b.y], [b.x + b.width, b.y],
+                     [b.x + b.width, b.y + b.height], [b.x, b.y + b.height]]
+                    for b in blocks
+                ], dtype=np.int32)
+                cv2.polylines(viz_image, list(corners), True, color, 1)
+        
+        # Confidence scores are only readable (and cheap enough) on sparse pages
+        if len(text_blocks) <= 100:
+            for block in text_blocks:
+                color = (255, 0, 0) if id(block) in label_ids else (0, 255, 0)
+                cv2.putText(
+                    viz_image,
+                    f"{block.confidence:.0f}%",
+                    (block.x, block.y - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    0.3, color, 1
+                )
         
         # Show result
         cv2.imshow("OCR Results", viz_image)
@@ -307,12 +763,19 @@ class TicketProcessor:
     This is where we combine OCR, structure detection, and DOCX creation
     """
     
-    def __init__(self):
-        self.ocr = OCRExtractor()
-        
-    def process_ticket(self, image_path, output_path):
+    def __init__(self, debug=None):
+        # Visualization windows are opt-in: pass debug=True or set QUICKCITE_DEBUG=1
+        if debug is None:
+            debug = os.environ.get('QUICKCITE_DEBUG') == '1'
+        self.debug = debug
+        self.ocr = OCRExtractor(debug=debug)
+        
+    def process_ticket(self, image_path, output_path, wait_for_key=True):
         """
         Complete ticket processing pipeline
+        
+        In debug mode it waits for a key press to close the visualization
+        windows at the end - wait_for_key=False skips that (for batch runs)
         """
         print("\n" + "="*70)
         print("🎯 COMPLETE TICKET PROCESSING PIPELINE")
@@ -325,8 +788,7 @@ class TicketProcessor:
         
         # Step 1: Preprocess image
         print("\n[Step 1/4] Preprocessing image...")
-        preprocessor = ImagePreprocessor()
-        preprocessor.debug = False
+        preprocessor = ImagePreprocessor(debug=False)
         results = preprocessor.process_ticket_image(image_path)
         
         # Step 2: Detect structure
@@ -366,20 +828,165 @@ class TicketProcessor:
             for key, value in ocr_results['ticket_info'].items():
                 print(f"  - {key}: {value}")
         
-        print("\n Press any key to close visualization windows...")
-        cv2.waitKey(0)
-        cv2.destroyAllWindows()
+        if self.debug and wait_for_key:
+            print("\n Press any key to close visualization windows...")
+            cv2.waitKey(0)
+            cv2.destroyAllWindows()
+        
+        return {
+            'structure': structure,
+            'ocr_results': ocr_results,
+            'output_path': output_path
+        }
+
+    def process_tickets(self, image_paths, output_dir):
+        """
+        Process many tickets, running OCR over all of them in one pass
+        Preprocessing and structure detection still run image by image
+        
+        Returns:
+            One result dict per image, like process_ticket's
+        """
+        from image_preprocessor import ImagePreprocessor
+        from form_structure_detector import FormStructureDetector
+        from docx_creator import DocxCreator
+        
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
         
+        preprocessor = ImagePreprocessor(debug=False)
+        detector = FormStructureDetector(debug=False)
+        creator = DocxCreator()
+        
+        # Steps 1-2 per image
+        prepared = []
+        for image_path in image_paths:
+            results = preprocessor.process_ticket_image(image_path)
+            structure = detector.analyze_form_structure(results['binary'])
+            prepared.append((image_path, results, structure))
+        
+        # Step 3 for the whole batch
+        all_text_blocks = self.ocr.extract_text_batch(
+            [results['enhanced'] for _, results, _ in prepared]
+        )
+        
+        # Step 4 per image
+        batch_results = []
+        for (image_path, results, structure), text_blocks in zip(prepared, all_text_blocks):
+            ocr_results = self.ocr.extract_ticket_information(
+                results['enhanced'], structure, text_blocks=text_blocks
+            )
+            output_path = output_dir / f"{Path(image_path).stem}_with_ocr.docx"
+            creator.create_form_replica(results['original'], structure, output_path)
+            batch_results.append({
+                'structure': structure,
+                'ocr_results': ocr_results,
+                'output_path': output_path
+            })
+        
+        print(f"\n✅ Processed {len(batch_results)} tickets into {output_dir}")
+        return batch_results
+
+    def process_tickets_parallel(self, image_paths, output_dir, max_workers=None):
+        """
+        Process many tickets at once, one worker thread per core
+        Teaching: OpenCV and Tesseract do their work outside the GIL, so threads
+        really do run side by side (entry points limit each Tesseract to one
+        OpenMP thread, see app.py and tasks.py)
+        
+        Returns:
+            One result dict per image, in the same order
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_paths = [output_dir / f"{Path(p).stem}_with_ocr.docx" for p in image_paths]
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            return list(executor.map(
+                lambda image_path, output_path: self.process_ticket(
+                    image_path, output_path, wait_for_key=False
+                ),
+                image_paths, output_paths
+            ))
+
+    def process_tickets_pipelined(self, image_paths, output_dir,
+                                  preprocess_workers=2, ocr_workers=None):
+        """
+        Process many tickets with preprocessing and OCR overlapped
+        Teaching: worker processes prepare the next images (OpenCV, CPU-bound)
+        while threads OCR the ones already prepared, so neither stage waits
+        for the whole batch
+        
+        Returns:
+            One result dict per image, in the same order
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        batch_results = [None] * len(image_paths)
+        with ProcessPoolExecutor(max_workers=preprocess_workers,
+                                 initializer=_init_prepare_worker) as prepare_pool, \
+             ThreadPoolExecutor(max_workers=ocr_workers or os.cpu_count()) as ocr_pool:
+            # Steps 1-2 in worker processes
+            prepare_futures = {
+                prepare_pool.submit(_prepare_ticket, image_path): i
+                for i, image_path in enumerate(image_paths)
+            }
+            
+            # Steps 3-4 on threads, as soon as each image is ready
+            ocr_futures = {}
+            for future in as_completed(prepare_futures):
+                i = prepare_futures[future]
+                original, enhanced, structure = future.result()
+                output_path = output_dir / f"{Path(image_paths[i]).stem}_with_ocr.docx"
+                ocr_futures[ocr_pool.submit(
+                    self._finish_ticket, original, enhanced, structure, output_path
+                )] = i
+            
+            for future in as_completed(ocr_futures):
+                batch_results[ocr_futures[future]] = future.result()
+        
+        print(f"\n✅ Processed {len(batch_results)} tickets into {output_dir}")
+        return batch_results
+    
+    def _finish_ticket(self, original, enhanced, structure, output_path):
+        """Steps 3-4 for a prepared ticket: OCR, then the DOCX"""
+        from docx_creator import DocxCreator
+        
+        ocr_results = self.ocr.extract_ticket_information(enhanced, structure)
+        # A creator per ticket - it keeps the page scaling between calls
+        DocxCreator().create_form_replica(original, structure, output_path)
         return {
             'structure': structure,
             'ocr_results': ocr_results,
             'output_path': output_path
         }
 
+def _init_prepare_worker():
+    """One OpenCV thread per worker process - the processes are the parallelism"""
+    cv2.setNumThreads(1)
+
+def _prepare_ticket(image_path):
+    """
+    Steps 1-2 for one ticket, in a worker process
+    Sends back only what OCR and the DOCX need (not the debug images)
+    """
+    from image_preprocessor import ImagePreprocessor
+    from form_structure_detector import FormStructureDetector
+    
+    results = ImagePreprocessor(debug=False).process_ticket_image(image_path)
+    structure = FormStructureDetector(debug=False).analyze_form_structure(results['binary'])
+    return results['original'], results['enhanced'], structure
+
 # Test the complete pipeline
 if __name__ == "__main__":
     from pathlib import Path
     
+    # One OpenMP thread per Tesseract, as app.py and tasks.py do - the batch
+    # modes already run one Tesseract per core (export it before starting
+    # Python to limit the in-process tesserocr engines too)
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    
     # Test OCR only
     print("🧪 Testing OCR Extraction...")
     
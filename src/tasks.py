@@ -0,0 +1,61 @@
+# src/tasks.py
+"""
+Celery worker for ticket processing
+Run the web app with CELERY_BROKER_URL set, then start workers with:
+    celery -A tasks worker --concurrency=2
+Each worker process loads its own Whisper model once, at startup
+"""
+
+import sys
+import os
+from dataclasses import asdict
+
+# One OpenMP thread per Tesseract - each worker process is already one of
+# several, so 4-thread engines would fight over the same cores.
+# Must happen before tesserocr is imported, which reads it at startup.
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from celery import Celery
+from celery.signals import worker_process_init
+
+from core.integrated_ticket_processor import IntegratedTicketFiller
+
+BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', BROKER_URL)
+
+celery = Celery('quickcite', broker=BROKER_URL, backend=RESULT_BACKEND)
+celery.conf.task_track_started = True
+
+# Loaded once per worker process, not once per task
+processor = None
+
+@worker_process_init.connect
+def load_processor(**kwargs):
+    """Preload the processor (and its Whisper model) when a worker starts"""
+    global processor
+    processor = IntegratedTicketFiller(whisper_model="tiny")
+
+@celery.task(name='quickcite.process_ticket')
+def process_ticket_task(image_path, audio_path, output_path, output_filename):
+    """Process one ticket and return a JSON-friendly summary"""
+    global processor
+    if processor is None:
+        # Solo/threaded pools don't fire worker_process_init
+        load_processor()
+
+    result = processor.process_complete_ticket(image_path, audio_path, output_path)
+
+    # FormElements are dataclasses - turn them into plain dicts for the result backend
+    field_mappings = [
+        {**mapping, 'field': asdict(mapping['field'])}
+        for mapping in result.get('field_mappings', [])
+    ]
+
+    return {
+        'output_file': output_filename,
+        'field_mappings': field_mappings,
+        'audio_data': result.get('audio_data', {})
+    }